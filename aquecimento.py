@@ -0,0 +1,119 @@
+import importlib
+import logging
+import os
+import threading
+import time
+
+import streamlit as st
+
+from dados import ARQUIVO_DADOS
+
+log = logging.getLogger(__name__)
+
+# ---------------------------------------------------------
+# AQUECIMENTO DOS CACHES (PARTIDA A FRIO)
+# ---------------------------------------------------------
+# Disparado pela primeira sessão do processo (main.py), numa thread própria:
+# ingestão, série da carteira, import do plotly e as figuras dos projetos mais
+# prováveis de serem abertos ficam prontos sem bloquear a renderização.
+# Antes do `streamlit run`, `python aquecimento.py` já deixa os caches em disco
+# (snapshot parquet, banco SQL e histórico) montados para a planilha atual.
+
+# Figuras pré-montadas: primeira página do grid (ordem padrão) + projeto inicial do detalhe
+PROJETOS_AQUECIDOS = 24
+
+# Plotly e figuras só depois da primeira página (ou deste limite, em s): não disputam a CPU com ela
+ESPERA_RENDERIZACAO = 30
+MODOS_CASCATA = ["Percentual (%)", "Valores (R$)"]
+
+def _inicio_processo():
+    # Instante de início do processo pelo /proc (Linux); fora dele, o import deste módulo
+    try:
+        with open("/proc/self/stat") as f:
+            inicio_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/stat") as f:
+            boot = next(int(linha.split()[1]) for linha in f if linha.startswith("btime"))
+        return boot + inicio_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, StopIteration):
+        return time.time()
+
+INICIO_PROCESSO = _inicio_processo()
+
+class Aquecimento:
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.etapas = {}
+        self.erro = None
+        self.primeira_renderizacao_s = None
+        self.pronto = threading.Event()
+        self._renderizou = threading.Event()
+        threading.Thread(target=self._executar, name="aquecimento", daemon=True).start()
+
+    def _medir(self, nome, funcao):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        self.etapas[nome] = (time.perf_counter() - inicio) * 1000
+        return resultado
+
+    def _executar(self):
+        # Imports aqui dentro: a primeira sessão não espera por eles
+        try:
+            from historico import serie_carteira
+            from ingestao import iniciar_ingestao
+
+            snapshot = self._medir("ingestao", lambda: iniciar_ingestao(self.caminho).atual)
+            self._medir("historico", serie_carteira)
+
+            self._renderizou.wait(ESPERA_RENDERIZACAO)
+            self._medir("import_plotly", lambda: importlib.import_module("figuras"))
+            self._medir("figuras", lambda: _aquecer_figuras(snapshot))
+        except Exception as erro:
+            # Aquecimento é só antecipação: as páginas refazem o que faltar
+            self.erro = str(erro)
+            log.warning("aquecimento interrompido: %s", erro)
+        finally:
+            self.pronto.set()
+
+    def registrar_renderizacao(self):
+        if self.primeira_renderizacao_s is None:
+            self.primeira_renderizacao_s = time.time() - INICIO_PROCESSO
+            log.info("primeira página renderizada %.2fs após o início do processo", self.primeira_renderizacao_s)
+        self._renderizou.set()
+
+def _projetos_provaveis(snapshot):
+    # Mesma ordem padrão do grid (Projeto decrescente), mais o primeiro da lista do detalhe
+    primeiros = snapshot.obras.sort_values('Projeto', ascending=False, kind="stable")['Projeto'].iloc[:PROJETOS_AQUECIDOS]
+    return list(dict.fromkeys([snapshot.indice['lista'][0], *primeiros]))
+
+def _aquecer_figuras(snapshot):
+    from figuras import LINHAS_CUSTO, obter_figura
+
+    for projeto in _projetos_provaveis(snapshot):
+        dados = snapshot.indice['registros'][projeto]
+        obter_figura(projeto, "gauge", dados)
+        for modo in MODOS_CASCATA:
+            obter_figura(projeto, "cascata", dados, modo)
+        for titulo, _, _ in LINHAS_CUSTO:
+            obter_figura(projeto, titulo, dados)
+
+# Um aquecimento por servidor; sessões seguintes só recebem a referência
+@st.cache_resource(show_spinner=False)
+def iniciar_aquecimento(caminho=ARQUIVO_DADOS):
+    return Aquecimento(caminho)
+
+# ---------------------------------------------------------
+# PRÉ-AQUECIMENTO EM DISCO (ANTES DO SERVIDOR)
+# ---------------------------------------------------------
+if __name__ == "__main__":
+    from dados import _gerar_snapshot, _hash_fonte, listar_planilhas
+    from fontes import abrir_fonte
+    from historico import registrar_versao
+    from ingestao import construir_snapshot
+
+    inicio = time.perf_counter()
+    arquivos = listar_planilhas(abrir_fonte(ARQUIVO_DADOS).caminho)
+    versao = _hash_fonte(arquivos)
+    _gerar_snapshot(arquivos, versao)
+    snapshot = construir_snapshot(versao)
+    registrar_versao(snapshot.versao, snapshot.projetos, snapshot.criado_em)
+    print(f"[aquecimento] versão {versao} pronta em {time.perf_counter() - inicio:.2f}s")
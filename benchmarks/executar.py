@@ -0,0 +1,233 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from gerar_planilha import caminho_planilha, gerar_planilha  # noqa: E402
+
+# ---------------------------------------------------------
+# CONFIGURAÇÃO
+# ---------------------------------------------------------
+TAMANHOS_PADRAO = [100, 10_000, 1_000_000]
+REPETICOES_PADRAO = 5
+
+PASTA_BENCH = os.path.dirname(os.path.abspath(__file__))
+PASTA_TRABALHO = os.path.join(PASTA_BENCH, ".trabalho")
+PASTA_RESULTADOS = os.path.join(PASTA_BENCH, "resultados")
+
+# AppTest: a primeira execução da página inclui a ingestão da planilha inteira
+TIMEOUT_PAGINA = 1800
+
+# ---------------------------------------------------------
+# MEDIÇÃO
+# ---------------------------------------------------------
+def medir(funcao, repeticoes=1, preparar=None):
+    # `preparar` roda fora do cronômetro (ex.: cópia do frame que a etapa altera)
+    tempos = []
+    resultado = None
+    for _ in range(repeticoes):
+        argumento = preparar() if preparar else None
+        inicio = time.perf_counter()
+        resultado = funcao(argumento) if preparar else funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return resultado, {
+        'repeticoes': repeticoes,
+        'min_s': min(tempos),
+        'mediana_s': statistics.median(tempos),
+        'media_s': statistics.fmean(tempos),
+    }
+
+def _pico_memoria_mb():
+    # ru_maxrss em KiB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+# ---------------------------------------------------------
+# ETAPAS (EXECUTADAS NUM PROCESSO POR PLANILHA)
+# ---------------------------------------------------------
+def medir_etapas(caminho, repeticoes):
+    import pandas as pd
+    from streamlit.testing.v1 import AppTest
+
+    from busca import montar_busca
+    from cards import html_colunas
+    from dados import _hash_arquivo, ler_abas_xlsx, ler_snapshot, limpar_monetarias, validar_planilha
+    from figuras import LINHAS_CUSTO, figura_cascata, figura_gauge, plot_row_fixed
+    from ingestao import com_hash, comparar_versoes, hash_por_projeto
+    from metricas import (IDS_ADM, atualizar_tabela_projetos, calcular_metricas, kpis_cabecalho, montar_cubo,
+                          montar_indice, montar_tabela_projetos)
+
+    etapas = {}
+
+    # 1. Carga e limpeza (a leitura do Excel é cara demais para repetir)
+    bruto, etapas['leitura_excel'] = medir(lambda: pd.read_excel(caminho))
+    validar_planilha(bruto)
+    _, etapas['limpar_monetarias'] = medir(limpar_monetarias, repeticoes, preparar=bruto.copy)
+    n_linhas = len(bruto)
+    del bruto
+
+    # Leitor em streaming usado na ingestão: só as colunas do dashboard, já limpas e tipadas
+    _, etapas['leitura_streaming'] = medir(lambda: ler_abas_xlsx(caminho))
+
+    # 2. Páginas completas (AppTest): a primeira execução inclui ingestão e snapshot parquet
+    pagina_geral = AppTest.from_file(os.path.join(RAIZ, "dashboard_visao_geral.py"), default_timeout=TIMEOUT_PAGINA)
+    _, etapas['pagina_visao_geral_primeira'] = medir(pagina_geral.run)
+    if pagina_geral.exception:
+        raise RuntimeError(f"visão geral falhou: {pagina_geral.exception[0].message}")
+    _, etapas['pagina_visao_geral_rerun'] = medir(pagina_geral.run, repeticoes)
+
+    # 3. Etapas isoladas sobre o snapshot gerado pela ingestão
+    versao = _hash_arquivo(caminho)
+    df, etapas['ler_snapshot'] = medir(lambda: ler_snapshot(versao), repeticoes)
+    _, etapas['calcular_metricas'] = medir(lambda: calcular_metricas(df), repeticoes)
+    projetos = montar_tabela_projetos(df)
+
+    cubo, etapas['montar_cubo'] = medir(lambda: montar_cubo(projetos), repeticoes)
+    _, etapas['kpis_cabecalho'] = medir(lambda: kpis_cabecalho(cubo), repeticoes)
+    cliente = projetos['Cliente'].iloc[0]
+    _, etapas['kpis_cabecalho_recorte'] = medir(lambda: kpis_cabecalho(cubo, cliente=cliente), repeticoes)
+    indice, etapas['montar_indice'] = medir(lambda: montar_indice(projetos), repeticoes)
+
+    # Nova versão com 1% das linhas alteradas: diff por hash e recálculo só do que mudou
+    base, alterada = com_hash(df), df.copy()
+    amostra = alterada.index[::100]
+    alterada.loc[amostra, 'Faturado'] = alterada.loc[amostra, 'Faturado'] + 1
+    alterada = com_hash(alterada)
+    projetos_base = montar_tabela_projetos(base)
+    indice_base = montar_indice(projetos_base)
+    diferencas, etapas['diff_versoes'] = medir(
+        lambda: comparar_versoes(hash_por_projeto(base), hash_por_projeto(alterada), versao), repeticoes)
+    projetos_alterados, etapas['tabela_incremental'] = medir(
+        lambda: atualizar_tabela_projetos(alterada, projetos_base), repeticoes)
+    _, etapas['indice_incremental'] = medir(
+        lambda: montar_indice(projetos_alterados, indice_base, diferencas.mudaram), repeticoes)
+
+    # Grid: filtro + ordenação padrão, HTML da primeira página e do grid inteiro
+    obras = projetos[~projetos['Projeto'].isin(IDS_ADM)]
+    status = obras['Status'].unique().tolist()
+    ordenadas, etapas['grid_filtro_ordenacao'] = medir(
+        lambda: obras[obras['Status'].isin(status)].sort_values(by='Projeto', ascending=False, kind="stable"), repeticoes)
+    _, etapas['grid_html_pagina'] = medir(lambda: html_colunas(ordenadas.iloc[:24]), repeticoes)
+    _, etapas['grid_html_completo'] = medir(lambda: html_colunas(ordenadas), repeticoes)
+
+    # Busca e facetas: índice montado uma vez por versão, filtro a cada tecla
+    busca, etapas['montar_busca'] = medir(lambda: montar_busca(obras), repeticoes)
+    _, etapas['busca_texto'] = medir(lambda: busca.filtrar(str(cliente)[:3]), repeticoes)
+    _, etapas['busca_facetas'] = medir(
+        lambda: busca.filtrar("", {'Status': status, 'Cliente': [cliente], 'Faixa_Margem': ["Na meta"]}, True), repeticoes)
+
+    # Figuras do detalhe de um projeto: construção e serialização (o que o st.plotly_chart envia)
+    projeto = ordenadas['Projeto'].iloc[0]
+    dados = indice['registros'][projeto]
+
+    def construir_figuras():
+        figuras = [figura_gauge(dados), figura_cascata(dados, "Valores (R$)")]
+        figuras += [plot_row_fixed(titulo, dados[orc], dados[real]) for titulo, orc, real in LINHAS_CUSTO]
+        return figuras
+
+    figuras, etapas['figuras_construcao'] = medir(construir_figuras, repeticoes)
+    _, etapas['figuras_serializacao'] = medir(lambda: [fig.to_json() for fig in figuras], repeticoes)
+
+    pagina_detalhe = AppTest.from_file(os.path.join(RAIZ, "dashboard_detalhado.py"), default_timeout=TIMEOUT_PAGINA)
+    pagina_detalhe.query_params["projeto"] = str(projeto)
+    _, etapas['pagina_detalhe_primeira'] = medir(pagina_detalhe.run)
+    if pagina_detalhe.exception:
+        raise RuntimeError(f"detalhe falhou: {pagina_detalhe.exception[0].message}")
+    _, etapas['pagina_detalhe_rerun'] = medir(pagina_detalhe.run, repeticoes)
+
+    return {
+        'linhas': n_linhas,
+        'versao': versao,
+        'etapas': etapas,
+        'pico_memoria_mb': _pico_memoria_mb(),
+    }
+
+# ---------------------------------------------------------
+# ORQUESTRAÇÃO (UM SUBPROCESSO POR TAMANHO)
+# ---------------------------------------------------------
+# Cada planilha roda num processo novo, numa pasta de trabalho própria: caches do
+# Streamlit, snapshots e histórico não vazam de um tamanho para outro.
+def _rodar_tamanho(n_linhas, repeticoes, regerar):
+    planilha = caminho_planilha(n_linhas)
+    if regerar or not os.path.exists(planilha):
+        print(f"[bench] gerando {planilha}")
+        gerar_planilha(n_linhas, planilha)
+
+    trabalho = os.path.join(PASTA_TRABALHO, str(n_linhas))
+    shutil.rmtree(trabalho, ignore_errors=True)
+    os.makedirs(trabalho)
+    saida = os.path.join(trabalho, "resultado.json")
+
+    ambiente = dict(os.environ, DASHBOARD_ARQUIVO=planilha, STREAMLIT_LOGGER_LEVEL="error")
+    comando = [sys.executable, os.path.abspath(__file__), "--medir", planilha,
+               "--saida", saida, "--repeticoes", str(repeticoes)]
+    print(f"[bench] medindo {n_linhas} linhas")
+    subprocess.run(comando, cwd=trabalho, env=ambiente, check=True)
+
+    with open(saida, encoding="utf-8") as f:
+        return json.load(f)
+
+def _commit_atual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _versoes_bibliotecas():
+    import pandas
+    import plotly
+    import pyarrow
+    import streamlit
+    return {'pandas': pandas.__version__, 'pyarrow': pyarrow.__version__,
+            'plotly': plotly.__version__, 'streamlit': streamlit.__version__}
+
+def executar(tamanhos, repeticoes, regerar, destino=None):
+    instante = time.strftime("%Y%m%dT%H%M%S")
+    resultado = {
+        'instante': instante,
+        'commit': _commit_atual(),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'backend': os.environ.get("DASHBOARD_BACKEND") or "pandas",
+        'bibliotecas': _versoes_bibliotecas(),
+        'tamanhos': [_rodar_tamanho(n, repeticoes, regerar) for n in tamanhos],
+    }
+
+    destino = destino or os.path.join(PASTA_RESULTADOS, f"{instante}.json")
+    os.makedirs(os.path.dirname(destino) or ".", exist_ok=True)
+    with open(destino, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+    return destino, resultado
+
+def _resumo(resultado):
+    for tamanho in resultado['tamanhos']:
+        print(f"\n{tamanho['linhas']} linhas (pico de memória {tamanho['pico_memoria_mb']:.0f} MB)")
+        for nome, tempo in tamanho['etapas'].items():
+            print(f"  {nome:<30} {tempo['mediana_s'] * 1000:>12.2f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark das etapas do dashboard em carteiras sintéticas")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=TAMANHOS_PADRAO)
+    parser.add_argument("--repeticoes", type=int, default=REPETICOES_PADRAO)
+    parser.add_argument("--regerar", action="store_true", help="recria as planilhas mesmo que já existam")
+    parser.add_argument("--saida", help="arquivo JSON de resultados (padrão: benchmarks/resultados/<instante>.json)")
+    parser.add_argument("--medir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.medir:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(medir_etapas(args.medir, args.repeticoes), f, ensure_ascii=False, indent=2, default=str)
+    else:
+        destino, resultado = executar(args.tamanhos, args.repeticoes, args.regerar, args.saida)
+        _resumo(resultado)
+        print(f"\n[bench] resultados em {destino}")
@@ -0,0 +1,116 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dados import COLS_MONETARIAS  # noqa: E402
+from metricas import IDS_ADM, STATUS_CARTEIRA  # noqa: E402
+
+# ---------------------------------------------------------
+# CARTEIRA SINTÉTICA (MESMO SCHEMA DE dados_obras_v5.xlsx)
+# ---------------------------------------------------------
+PASTA_PLANILHAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "planilhas")
+
+DESCRICOES = ["Laudo Termográfico", "Manutenção Preventiva", "Adequação NR-10", "Projeto Elétrico",
+              "Sistema de Incêndio", "SPDA", "Subestação", "Automação Industrial"]
+CLIENTES = ["Embraer", "Suzano", "Petrobras", "Gerdau", "Braskem", "Klabin", "Vale", "Ambev",
+            "WEG", "Votorantim", "CSN", "Usiminas"]
+CIDADES = ["Curitiba - PR", "São Paulo - SP", "Belo Horizonte - MG", "Rio de Janeiro - RJ", "Salvador - BA",
+           "Recife - PE", "Porto Alegre - RS", "Campinas - SP", "Joinville - SC", "Manaus - AM"]
+PESOS_STATUS = [0.10, 0.40, 0.15, 0.35]  # na ordem de STATUS_CARTEIRA
+
+# Fração das células monetárias gravadas como texto "R$ 1.234,56" e, delas, as ilegíveis
+FRACAO_TEXTO = 0.3
+FRACAO_INVALIDA = 0.001
+
+def _moeda_br(valor):
+    return "R$ " + f"{valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+def gerar_carteira(n_linhas, semente=42):
+    rng = np.random.default_rng(semente)
+    n_obras = max(n_linhas - len(IDS_ADM), 1)
+
+    vendido = np.round(rng.lognormal(12.5, 1.2, n_obras), 2)
+    conclusao = rng.integers(0, 101, n_obras)
+    mat_orc = np.round(vendido * rng.uniform(0.2, 0.45, n_obras), 2)
+    desp_orc = np.round(mat_orc * 0.2, 2)
+    hh_orc_vlr = np.round(mat_orc * 0.8, 2)
+    hh_orc_qtd = np.maximum((hh_orc_vlr / 80).astype(int), 1)
+
+    # Realizado proporcional ao avanço físico, com desvio para gerar obras críticas
+    consumo = conclusao / 100 * rng.uniform(0.7, 1.4, n_obras)
+    obras = pd.DataFrame({
+        'Projeto': np.arange(2026001, 2026001 + n_obras),
+        'Descricao': rng.choice(DESCRICOES, n_obras),
+        'Cliente': rng.choice(CLIENTES, n_obras),
+        'Cidade': rng.choice(CIDADES, n_obras),
+        'Status': rng.choice(STATUS_CARTEIRA, n_obras, p=PESOS_STATUS),
+        'Vendido': vendido,
+        'Faturado': np.round(vendido * conclusao / 100 * rng.uniform(0.6, 1.0, n_obras), 2),
+        'Mat_Orc': mat_orc,
+        'Mat_Real': np.round(mat_orc * consumo, 2),
+        'Desp_Orc': desp_orc,
+        'Desp_Real': np.round(desp_orc * consumo, 2),
+        'HH_Orc_Qtd': hh_orc_qtd,
+        'HH_Real_Qtd': (hh_orc_qtd * consumo).astype(int),
+        'HH_Orc_Vlr': hh_orc_vlr,
+        'HH_Real_Vlr': np.round(hh_orc_vlr * consumo, 2),
+        'Impostos': np.round(vendido * 0.165, 2),
+        'Conclusao_%': conclusao,
+    })
+
+    # Centros de custo administrativos (overhead): só custo realizado
+    adm = pd.DataFrame({
+        'Projeto': [float(i) for i in IDS_ADM],  # como na planilha real: número decimal
+        'Descricao': "Custos Administrativos",
+        'Cliente': "TE Engenharia",
+        'Cidade': "Curitiba - PR",
+        'Status': "Em andamento",
+    })
+    for col in obras.columns[5:]:
+        adm[col] = 0
+    adm['Desp_Real'] = np.round(obras['Vendido'].sum() * 0.02, 2)
+    adm['HH_Real_Vlr'] = np.round(obras['Vendido'].sum() * 0.03, 2)
+
+    df = pd.concat([obras, adm], ignore_index=True)
+
+    # Colunas monetárias mistas: parte número, parte texto no padrão brasileiro, poucas ilegíveis
+    for col in COLS_MONETARIAS:
+        valores = df[col].astype(object)
+        texto = rng.random(len(df)) < FRACAO_TEXTO
+        valores[texto] = [_moeda_br(v) for v in df.loc[texto, col]]
+        invalidas = texto & (rng.random(len(df)) < FRACAO_INVALIDA / FRACAO_TEXTO)
+        valores[invalidas] = "a definir"
+        df[col] = valores
+    return df
+
+def caminho_planilha(n_linhas):
+    return os.path.join(PASTA_PLANILHAS, f"carteira_{n_linhas}.xlsx")
+
+def gerar_planilha(n_linhas, destino=None, semente=42):
+    destino = destino or caminho_planilha(n_linhas)
+    os.makedirs(os.path.dirname(destino) or ".", exist_ok=True)
+    df = gerar_carteira(n_linhas, semente)
+
+    # Modo write_only grava linha a linha: o to_excel montaria a pasta inteira em memória
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(list(df.columns))
+    for linha in df.itertuples(index=False):
+        ws.append([v.item() if hasattr(v, "item") else v for v in linha])
+    wb.save(destino)
+    return destino
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera planilhas sintéticas no schema de dados_obras_v5.xlsx")
+    parser.add_argument("linhas", type=int, nargs="+", help="quantidade de linhas de cada planilha")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    for n in args.linhas:
+        print(gerar_planilha(n, semente=args.semente))
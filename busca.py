@@ -0,0 +1,144 @@
+import re
+import unicodedata
+from bisect import bisect_left
+
+import numpy as np
+
+from metricas import META_MARGEM
+
+# ---------------------------------------------------------
+# BUSCA E FACETAS DO GRID (ÍNDICE POR VERSÃO)
+# ---------------------------------------------------------
+# Montado uma vez por versão dos dados (ingestao.construir_snapshot), sobre as
+# obras na ordem do snapshot. Cada filtro vira uma máscara booleana por posição:
+# a busca consulta o índice invertido e as facetas, tabelas de códigos; nada
+# percorre o texto do frame a cada tecla.
+COL_ID = 'Projeto'
+COLS_TEXTO = ['Descricao', 'Cliente', 'Cidade']
+COLS_FACETA = ['Status', 'Cliente', 'Cidade']
+
+# Faixas de margem: limites inferiores em %, na ordem de exibição
+FAIXAS_MARGEM = ["Negativa", "Abaixo da meta", "Na meta"]
+LIMITES_MARGEM = [0.0, META_MARGEM]
+
+_RE_TOKEN = re.compile(r"[a-z0-9]+")
+
+def normalizar(texto):
+    # Sem acento e em minúsculas: "São Paulo" e "sao paulo" dão os mesmos tokens
+    texto = str(texto).lower()
+    if texto.isascii():
+        return texto
+    texto = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in texto if not unicodedata.combining(c))
+
+def tokens(texto):
+    return _RE_TOKEN.findall(normalizar(texto))
+
+def _codigos(serie):
+    # Texto já é categoria no snapshot (dados.compactar_tipos); o astype é só garantia
+    serie = serie.astype("category")
+    return list(serie.cat.categories), serie.cat.codes.to_numpy()
+
+def _posicoes_por_codigo(codigos, n_categorias):
+    # Posições de cada categoria com um único argsort (fatias do mesmo array)
+    ordem = np.argsort(codigos, kind="stable")
+    limites = np.searchsorted(codigos[ordem], np.arange(n_categorias + 1))
+    return [ordem[limites[k]:limites[k + 1]] for k in range(n_categorias)]
+
+def _faixas_margem(margem):
+    faixas = np.digitize(margem, LIMITES_MARGEM)
+    return np.where(np.isnan(margem), -1, faixas)
+
+def _indice_ids(serie):
+    # IDs são (quase) únicos: em vez de uma postagem por ID, um array ordenado de
+    # termos com a posição ao lado; o prefixo vira um intervalo de searchsorted.
+    # O ID entra inteiro ("5009.2025") e, se tiver separadores, também por partes.
+    categorias, codigos = _codigos(serie)
+    presentes = codigos >= 0
+    posicoes = np.flatnonzero(presentes)
+    normalizados = [normalizar(c) for c in categorias]
+    termos = np.array(normalizados, dtype=str)[codigos[presentes]] if normalizados else np.array([], dtype=str)
+
+    partes = [(i, termo) for i, texto in enumerate(normalizados) if not texto.isalnum()
+              for termo in tokens(texto) if termo != texto]
+    if partes:
+        grupos = _posicoes_por_codigo(codigos, len(categorias))
+        extras = [grupos[i] for i, _ in partes]
+        termos = np.concatenate([termos, np.repeat([termo for _, termo in partes], [len(g) for g in extras])])
+        posicoes = np.concatenate([posicoes, *extras])
+
+    ordem = np.argsort(termos, kind="stable")
+    return termos[ordem], posicoes[ordem]
+
+class IndiceBusca:
+    def __init__(self, obras):
+        self.n = len(obras)
+
+        # Índice invertido: vocabulário ordenado (prefixo por bisect) -> posições
+        postagens = {}
+        for col in COLS_TEXTO:
+            categorias, codigos = _codigos(obras[col])
+            for categoria, posicoes in zip(categorias, _posicoes_por_codigo(codigos, len(categorias))):
+                if not len(posicoes):
+                    continue
+                for termo in set(tokens(categoria)):
+                    postagens.setdefault(termo, []).append(posicoes)
+        self.vocabulario = sorted(postagens)
+        self.postagens = [np.unique(np.concatenate(postagens[termo])) for termo in self.vocabulario]
+        self.ids, self.posicoes_ids = _indice_ids(obras[COL_ID])
+
+        # Facetas: (valores, código por posição); -1 = vazio
+        self.facetas = {col: _codigos(obras[col]) for col in COLS_FACETA}
+        margem = obras['Margem_%'].to_numpy(dtype=np.float64)
+        self.facetas['Faixa_Margem'] = (FAIXAS_MARGEM, _faixas_margem(margem))
+        self._posicao = {nome: {v: i for i, v in enumerate(valores)} for nome, (valores, _) in self.facetas.items()}
+        self.criticos = obras['E_Critico'].to_numpy(dtype=bool)
+
+        # Contagens por valor, para os rótulos dos filtros
+        self.contagens = {
+            nome: dict(zip(valores, np.bincount(codigos[codigos >= 0], minlength=len(valores)).tolist()))
+            for nome, (valores, codigos) in self.facetas.items()
+        }
+        self.contagens['E_Critico'] = int(self.criticos.sum())
+
+    def valores(self, faceta):
+        # Só os valores presentes, em ordem alfabética (faixas na ordem própria)
+        contagens = self.contagens[faceta]
+        presentes = [v for v, qtd in contagens.items() if qtd > 0]
+        return presentes if faceta == 'Faixa_Margem' else sorted(presentes)
+
+    def _mascara_termo(self, termo):
+        # Prefixo: "emb" encontra "embraer" enquanto o usuário digita
+        inicio = bisect_left(self.vocabulario, termo)
+        fim = bisect_left(self.vocabulario, termo + "\uffff", inicio)
+        mascara = np.zeros(self.n, dtype=bool)
+        if fim > inicio:
+            mascara[np.concatenate(self.postagens[inicio:fim])] = True
+
+        inicio, fim = np.searchsorted(self.ids, [termo, termo + "\uffff"])
+        mascara[self.posicoes_ids[inicio:fim]] = True
+        return mascara
+
+    def _mascara_faceta(self, faceta, selecionados):
+        valores, codigos = self.facetas[faceta]
+        posicao = self._posicao[faceta]
+
+        # Tabela por código; a última entrada atende o -1 (vazio), nunca selecionado
+        tabela = np.zeros(len(valores) + 1, dtype=bool)
+        tabela[[posicao[v] for v in selecionados if v in posicao]] = True
+        return tabela[codigos]
+
+    def filtrar(self, texto="", facetas=None, somente_criticos=False):
+        # Termos combinados com E; faceta sem seleção (None) não filtra
+        mascara = np.ones(self.n, dtype=bool)
+        for termo in dict.fromkeys(tokens(texto)):
+            mascara &= self._mascara_termo(termo)
+        for faceta, selecionados in (facetas or {}).items():
+            if selecionados is not None:
+                mascara &= self._mascara_faceta(faceta, selecionados)
+        if somente_criticos:
+            mascara &= self.criticos
+        return mascara
+
+def montar_busca(obras):
+    return IndiceBusca(obras)
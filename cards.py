@@ -0,0 +1,121 @@
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+from metricas import META_MARGEM
+
+# ---------------------------------------------------------
+# FORMATAÇÃO
+# ---------------------------------------------------------
+def formatar_valor_ptbr(valor):
+    if valor >= 1_000_000: return f"R$ {valor/1_000_000:.1f}M".replace(".", ",")
+    elif valor >= 1_000: return f"R$ {valor/1_000:.1f}k".replace(".", ",")
+    else: return f"{valor:,.0f}".replace(",", ".")
+
+# Mesma regra de formatar_valor_ptbr, aplicada à coluna inteira
+def formatar_valores_ptbr(valores):
+    v = valores.to_numpy(dtype=float)
+    texto = np.where(v >= 1_000_000, np.char.mod("R$ %.1fM", v / 1_000_000),
+            np.where(v >= 1_000, np.char.mod("R$ %.1fk", v / 1_000), np.char.mod("%.0f", v)))
+    texto = np.char.replace(texto.astype(str), ".", ",").astype(object)
+
+    # Sem abreviação mas com 4+ dígitos depois de arredondar (negativos até -1.000,
+    # e 999,5 a 1.000): separador de milhar, caso raro formatado um a um. Em object:
+    # o array <U do np.char cortaria os textos mais longos
+    milhar = (v < 1_000) & (np.abs(np.round(v)) >= 1_000)
+    if milhar.any():
+        texto[milhar] = [formatar_valor_ptbr(x) for x in v[milhar]]
+    return pd.Series(texto, index=valores.index)
+
+def _pct(valores):
+    return pd.Series(np.char.mod("%.0f", valores.to_numpy(dtype=float)), index=valores.index)
+
+def _escapar(serie):
+    return (serie.astype(str).str.replace("&", "&amp;", regex=False)
+                             .str.replace("<", "&lt;", regex=False)
+                             .str.replace(">", "&gt;", regex=False)
+                             .str.replace('"', "&quot;", regex=False))
+
+# ---------------------------------------------------------
+# TABELAS DE CORES
+# ---------------------------------------------------------
+# Status -> (cor da borda/progresso, fundo do badge, texto do badge)
+CORES_STATUS = {
+    "Finalizado": ("#3fb950", "rgba(63,185,80,0.2)", "#3fb950"),
+    "Apresentado": ("#a371f7", "rgba(163,113,247,0.2)", "#d2a8ff"),
+    "Em andamento": ("#d29922", "rgba(210,153,34,0.2)", "#e3b341"),
+}
+CORES_STATUS_PADRAO = ("#da3633", "rgba(218,54,51,0.2)", "#f85149")
+
+COR_ALERTA = "#da3633"
+COR_OK = "#3fb950"
+COR_NEUTRA = "#e6edf3"
+
+# Página de detalhe (url_path gerado pelo st.navigation a partir do nome do arquivo)
+PAGINA_DETALHE = "dashboard_detalhado"
+
+# ---------------------------------------------------------
+# RENDERIZAÇÃO EM LOTE DOS CARDS
+# ---------------------------------------------------------
+def _cor_status(status, posicao):
+    mapa = {k: v[posicao] for k, v in CORES_STATUS.items()}
+    return status.map(mapa).fillna(CORES_STATUS_PADRAO[posicao])
+
+# Selo de projeto novo/alterado desde a versão anterior dos dados (ingestao.Diferencas)
+SELOS_MUDANCA = {
+    "inseridos": '<span class="badge-mudanca" title="Incluído desde a última atualização dos dados">Novo</span>',
+    "alterados": '<span class="badge-mudanca" title="Alterado desde a última atualização dos dados">Alterado</span>',
+}
+
+def html_cards(df, diferencas=None):
+    status = df['Status'].astype(str).str.strip()
+    cor_t, bg_b, cl_b = (_cor_status(status, i) for i in range(3))
+
+    cor_margem = pd.Series(np.where(df['Margem_%'] < META_MARGEM, COR_ALERTA, COR_OK), index=df.index)
+    cor_horas = pd.Series(np.where(df['HH_Progresso'] > 100, COR_ALERTA, COR_NEUTRA), index=df.index)
+    cor_mat = pd.Series(np.where(df['Mat_%'] > 100, COR_ALERTA, COR_NEUTRA), index=df.index)
+
+    # Marcador de obra crítica com os motivos (alertas de regras.json) no tooltip
+    alerta = pd.Series(np.where(df['E_Critico'].astype(bool),
+                                '<span class="badge-alerta" title="' + _escapar(df['Motivo_Critico']) + '">⚠ Crítica</span>', ""),
+                       index=df.index)
+
+    selo = pd.Series("", index=df.index)
+    if diferencas is not None and diferencas.mudaram:
+        ids = df['Projeto'].astype(str)
+        selo = pd.Series(np.select([ids.isin(list(diferencas.inseridos)), ids.isin(list(diferencas.alterados))],
+                                   [SELOS_MUDANCA["inseridos"], SELOS_MUDANCA["alterados"]], ""), index=df.index)
+
+    pct = df['Conclusao_%'].fillna(0).astype(int).astype(str)
+    projeto = _escapar(df['Projeto'])
+    link = PAGINA_DETALHE + "?projeto=" + df['Projeto'].astype(str).map(quote)
+
+    return (
+        '<div class="project-tile">'
+        '<div class="tile-header" style="border-left: 3px solid ' + cor_t + '">'
+        '<div class="tile-title" title="' + projeto + '">' + projeto + ' - ' + _escapar(df['Descricao']) + '</div>'
+        '<div class="tile-sub">' + _escapar(df['Cliente']) + ' | ' + _escapar(df['Cidade']) + '</div>'
+        '</div>'
+        '<div class="data-strip">'
+        '<div class="data-col"><span class="data-lbl">Valor</span><span class="data-val">' + formatar_valores_ptbr(df['Vendido']) + '</span></div>'
+        '<div class="data-col"><span class="data-lbl">Margem</span><span class="data-val" style="color: ' + cor_margem + '">' + _pct(df['Margem_%']) + '%</span></div>'
+        '<div class="data-col"><span class="data-lbl">Horas</span><span class="data-val" style="color: ' + cor_horas + '">' + _pct(df['HH_Progresso']) + '%</span></div>'
+        '<div class="data-col"><span class="data-lbl">Mat</span><span class="data-val" style="color: ' + cor_mat + '">' + _pct(df['Mat_%']) + '%</span></div>'
+        '</div>'
+        '<div class="tile-footer">'
+        '<div class="progress-track"><div class="progress-fill" style="width: ' + pct + '%; background-color: ' + cor_t + ';"></div></div>'
+        '<div class="footer-row">'
+        '<span class="badge-status" style="background-color: ' + bg_b + '; color: ' + cl_b + '">' + _escapar(status) + '</span>'
+        + alerta + selo +
+        '<span class="footer-pct" style="color: ' + cl_b + '">' + pct + '%</span>'
+        '</div>'
+        '</div>'
+        '<div class="tile-actions"><a class="tile-btn" href="' + link + '" target="_self">Abrir ↗</a></div>'
+        '</div>'
+    )
+
+# Um bloco HTML por coluna do grid (cards distribuídos como no grid original: i % n)
+def html_colunas(df, n_colunas=3, diferencas=None):
+    cards = html_cards(df, diferencas) if not df.empty else pd.Series(dtype=str)
+    return ["".join(cards.iloc[j::n_colunas]) for j in range(n_colunas)]
@@ -0,0 +1,32 @@
+import streamlit as st
+
+from ingestao import erro_ingestao, snapshot_pronto
+
+# Intervalo (s) com que cada sessão aberta confere se há dados novos
+INTERVALO_AVISO = 15
+
+# Fragmento leve: só compara o token de versão do snapshot em uso, sem recarregar nada
+@st.fragment(run_every=INTERVALO_AVISO)
+def aviso_nova_versao(versao_exibida):
+    # Planilha nova rejeitada (colunas faltando, arquivo corrompido): a versão anterior segue no ar
+    erro = erro_ingestao()
+    if erro:
+        st.warning(f"⚠️ A última atualização da planilha foi rejeitada e os dados exibidos são da versão anterior: {erro}")
+
+    # Antes da primeira ingestão completa (detalhe aberto por link) não há o que comparar
+    snapshot = snapshot_pronto()
+    if snapshot is None or snapshot.versao == versao_exibida:
+        return
+
+    col_aviso, col_botao = st.columns([5, 1], vertical_alignment="center")
+    with col_aviso:
+        # Com a versão exibida logo antes da nova, o aviso diz quantos projetos mudaram
+        diferencas = snapshot.diferencas
+        resumo = ""
+        if diferencas is not None and diferencas.versao_anterior == versao_exibida:
+            resumo = (f" ({len(diferencas.inseridos)} projeto(s) novo(s), {len(diferencas.alterados)} alterado(s), "
+                      f"{len(diferencas.removidos)} removido(s))")
+        st.info(f"🔄 A planilha de obras foi atualizada{resumo}. Os valores exibidos são da versão anterior.")
+    with col_botao:
+        if st.button("Atualizar dados", use_container_width=True):
+            st.rerun()
@@ -0,0 +1,101 @@
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+from dados import PASTA_CACHE, VERSAO_SCHEMA
+from metricas import IDS_ADM
+from regras import REGRAS
+
+# ---------------------------------------------------------
+# BACKEND SQL OPCIONAL (SQLITE)
+# ---------------------------------------------------------
+# Ative com DASHBOARD_BACKEND=sqlite. Cada versão dos dados vira um arquivo
+# .sqlite indexado; filtro/ordenação do grid e a busca do detalhe passam a ser
+# consultas com LIMIT/OFFSET em vez de operações sobre o frame completo.
+BACKEND_SQL = os.environ.get("DASHBOARD_BACKEND", "").strip().lower() == "sqlite"
+
+COLUNAS_INDEXADAS = ['Status', 'Projeto', 'Ordem_Projeto', 'Vendido', 'Margem_%', 'Conclusao_%']
+
+# Projeto é texto no banco: a ordenação usa a posição numérica do ID (código da categoria)
+COLUNAS_ORDEM = {'Projeto': 'Ordem_Projeto'}
+
+# Conexões somente leitura, uma por thread (o sqlite3 não compartilha entre threads)
+_local = threading.local()
+
+# Versão das colunas da tabela de projetos no banco (ex.: Hash_Linha)
+VERSAO_BANCO = 3
+
+# O banco guarda as métricas e os alertas: a assinatura das regras entra no nome
+def caminho_banco(versao):
+    return os.path.join(PASTA_CACHE, f"{versao}-projetos-s{VERSAO_SCHEMA}-b{VERSAO_BANCO}-r{REGRAS.assinatura}.sqlite")
+
+def gerar_banco(versao, projetos):
+    destino = caminho_banco(versao)
+    if os.path.exists(destino):
+        return destino
+
+    df = projetos.assign(E_Adm=projetos['Projeto'].isin(IDS_ADM), Ordem_Projeto=projetos['Projeto'].cat.codes)
+
+    # Montado num arquivo temporário e publicado com os.replace (atômico)
+    os.makedirs(PASTA_CACHE, exist_ok=True)
+    temporario = f"{destino}.{os.getpid()}.tmp"
+    if os.path.exists(temporario):
+        os.remove(temporario)
+    con = sqlite3.connect(temporario)
+    try:
+        df.to_sql("projetos", con, index=False)
+        for col in COLUNAS_INDEXADAS:
+            con.execute(f'CREATE INDEX "idx_{col}" ON projetos ("{col}")')
+        con.execute('CREATE INDEX "idx_adm_status" ON projetos (E_Adm, Status)')
+        con.commit()
+    finally:
+        con.close()
+    os.replace(temporario, destino)
+    return destino
+
+def _conexao(versao):
+    conexoes = getattr(_local, "conexoes", None)
+    if conexoes is None:
+        conexoes = _local.conexoes = {}
+
+    con = conexoes.get(versao)
+    if con is None:
+        # Ao trocar de versão, a conexão da versão anterior é fechada
+        for antiga in conexoes.values():
+            antiga.close()
+        conexoes.clear()
+        con = sqlite3.connect(f"file:{caminho_banco(versao)}?mode=ro", uri=True)
+        conexoes[versao] = con
+    return con
+
+def _filtro_status(status):
+    marcadores = ", ".join("?" * len(status))
+    return f"E_Adm = 0 AND Status IN ({marcadores})", list(status)
+
+def contar_obras(versao, status):
+    where, params = _filtro_status(status)
+    return _conexao(versao).execute(f"SELECT COUNT(*) FROM projetos WHERE {where}", params).fetchone()[0]
+
+def consultar_obras(versao, status, coluna_ordem, crescente, limite, offset=0):
+    if coluna_ordem not in COLUNAS_INDEXADAS:
+        raise ValueError(f"Ordenação não suportada: {coluna_ordem}")
+    coluna_ordem = COLUNAS_ORDEM.get(coluna_ordem, coluna_ordem)
+
+    # Nulos por último e empates na ordem da planilha, como no sort_values estável do pandas
+    direcao = "ASC" if crescente else "DESC"
+    where, params = _filtro_status(status)
+    sql = (f'SELECT * FROM projetos WHERE {where} '
+           f'ORDER BY "{coluna_ordem}" IS NULL, "{coluna_ordem}" {direcao}, rowid LIMIT ? OFFSET ?')
+    return pd.read_sql_query(sql, _conexao(versao), params=params + [limite, offset])
+
+def buscar_projeto(versao, projeto):
+    # Escalares numpy (vindos do índice) não são aceitos pelo sqlite3
+    if hasattr(projeto, "item"):
+        projeto = projeto.item()
+    cursor = _conexao(versao).execute("SELECT * FROM projetos WHERE Projeto = ? LIMIT 1", [projeto])
+    linha = cursor.fetchone()
+    if linha is None:
+        return None
+    return dict(zip([c[0] for c in cursor.description], linha))
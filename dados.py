@@ -0,0 +1,502 @@
+import glob
+import hashlib
+import logging
+import math
+import multiprocessing
+import os
+import threading
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from fontes import abrir_fonte
+
+log = logging.getLogger(__name__)
+
+# ---------------------------------------------------------
+# CONFIGURAÇÃO DA BASE
+# ---------------------------------------------------------
+# DASHBOARD_ARQUIVO aponta outra planilha (ex.: as sintéticas dos benchmarks), uma pasta
+# ou um glob ("regionais/*.xlsx"): todas as planilhas e abas viram uma tabela só.
+# Também aceita um arquivo num repositório git ("github:dono/repo/planilha.xlsx@main", ver fontes.py)
+ARQUIVO_DADOS = os.environ.get("DASHBOARD_ARQUIVO", "dados_obras_v5.xlsx")
+PASTA_CACHE = ".cache_dados"
+
+# Colunas monetárias que podem vir como texto no padrão brasileiro
+COLS_MONETARIAS = ['Vendido', 'Faturado', 'Mat_Real', 'Desp_Real', 'HH_Real_Vlr', 'Impostos', 'Mat_Orc']
+
+# Colunas sem as quais a planilha é rejeitada (as monetárias ausentes viram 0)
+COLUNAS_OBRIGATORIAS = ['Projeto', 'Descricao', 'Cliente', 'Cidade', 'Status', 'Desp_Orc',
+                        'HH_Orc_Qtd', 'HH_Real_Qtd', 'HH_Orc_Vlr', 'Conclusao_%']
+
+# Colunas que as páginas usam; as demais são descartadas na ingestão
+COLUNAS_USADAS = ['Projeto', 'Descricao', 'Cliente', 'Cidade', 'Status', 'Vendido', 'Faturado',
+                  'Mat_Orc', 'Mat_Real', 'Desp_Orc', 'Desp_Real', 'HH_Orc_Qtd', 'HH_Real_Qtd',
+                  'HH_Orc_Vlr', 'HH_Real_Vlr', 'Impostos', 'Conclusao_%']
+
+# Schema compacto: texto repetitivo vira categoria; quantidades inteiras vão para float32
+# (exato até 2^24). Valores em R$ seguem float64: float32 perderia os centavos.
+COLS_CATEGORICAS = ['Descricao', 'Cliente', 'Cidade', 'Status', 'Origem']
+COLS_FLOAT32 = ['HH_Orc_Qtd', 'HH_Real_Qtd', 'Conclusao_%']
+
+# Colunas que descrevem a leitura, não o projeto (ex.: nome do arquivo de origem)
+COLS_METADADOS = ['Origem']
+
+# Incrementar quando o formato do snapshot mudar (invalida os caches em disco)
+VERSAO_SCHEMA = 3
+
+# Linhas por row group: a leitura de um só projeto abre apenas o grupo que o contém
+LINHAS_POR_GRUPO = 65_536
+
+# Intervalo (s) da varredura de mtime quando não há eventos do sistema de arquivos
+INTERVALO_VIGIA = 2.0
+ESPERA_GRAVACAO = 0.5
+
+# ---------------------------------------------------------
+# LIMPEZA
+# ---------------------------------------------------------
+def _parse_moeda_br(serie):
+    # Células já numéricas passam direto; texto segue o padrão "R$ 1.234,56"
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.astype(float), pd.Series(False, index=serie.index)
+
+    # Em colunas mistas o acessor .str devolve NaN para o que não é texto
+    texto = (serie.str.replace(r"R\$|%|\s", "", regex=True)
+                  .str.replace(".", "", regex=False)
+                  .str.replace(",", ".", regex=False))
+    convertido = pd.to_numeric(texto, errors="coerce")
+    numerico = pd.to_numeric(serie.where(texto.isna()), errors="coerce")
+    valores = convertido.fillna(numerico).astype(float)
+
+    falhas = valores.isna() & serie.notna()
+    return valores.mask(falhas, 0.0), falhas
+
+def limpar_monetarias(df):
+    registros = []
+    for col in COLS_MONETARIAS:
+        if col not in df.columns:
+            df[col] = 0.0
+            continue
+
+        valores, falhas = _parse_moeda_br(df[col])
+        if falhas.any():
+            registros.append(pd.DataFrame({
+                "Linha": df.index[falhas] + 2,  # linha no Excel (cabeçalho = 1)
+                "Projeto": df.loc[falhas, "Projeto"].astype("string") if "Projeto" in df.columns else pd.NA,
+                "Coluna": col,
+                "Valor": df.loc[falhas, col].astype("string"),
+            }))
+        df[col] = valores
+
+    colunas = ["Linha", "Projeto", "Coluna", "Valor"]
+    df_falhas = pd.concat(registros, ignore_index=True) if registros else pd.DataFrame(columns=colunas)
+    return df, df_falhas.astype({"Projeto": "string", "Coluna": "string", "Valor": "string"})
+
+def _id_texto(valor):
+    # 2026001.0 -> "2026001"; 5009.2025 -> "5009.2025" (repr mais curto do float = valor digitado)
+    if isinstance(valor, float):
+        return str(int(valor)) if valor.is_integer() else repr(valor)
+    return str(valor).strip()
+
+def ids_projeto(serie):
+    # ID exato como texto, em categoria ordenada pelo valor numérico (ordenação igual à antiga)
+    ids = serie.map(_id_texto, na_action="ignore")
+    categorias = pd.DataFrame({'id': ids.dropna().unique()})
+    categorias['numero'] = pd.to_numeric(categorias['id'], errors="coerce")
+    ordem = categorias.sort_values(['numero', 'id'])['id']
+    return pd.Series(pd.Categorical(ids, categories=ordem, ordered=True), index=serie.index)
+
+def compactar_tipos(df):
+    for col in COLS_CATEGORICAS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("string").str.strip().astype("category")
+    for col in COLS_FLOAT32:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(np.float32)
+
+    # Colunas de texto que sobraram como object (tipos mistos) viram string para o Arrow
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = df[col].astype("string")
+    return df
+
+def validar_planilha(df):
+    faltando = [col for col in COLUNAS_OBRIGATORIAS if col not in df.columns]
+    if faltando:
+        raise ValueError(f"Planilha sem as colunas obrigatórias: {', '.join(faltando)}")
+    if df['Projeto'].isna().all():
+        raise ValueError("Planilha sem nenhum projeto preenchido")
+
+# ---------------------------------------------------------
+# LEITURA EM STREAMING (OPENPYXL READ-ONLY)
+# ---------------------------------------------------------
+# Percorre a aba linha a linha guardando só as colunas usadas, já tipadas: texto
+# vira códigos de categoria e números vão para arrays de double; a moeda fica
+# bruta e passa por limpar_monetarias no fim da aba. Resultado igual ao de
+# read_excel + limpar_monetarias + compactar_tipos, sem o DataFrame de objetos.
+
+# Textos que o read_excel trata como vazio (na_values padrão) e erros de fórmula
+TEXTOS_VAZIOS = {"", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND",
+                 "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+                 "#NULL!", "#DIV/0!", "#VALUE!", "#REF!", "#NAME?", "#NUM!"}
+
+def _numero_celula(valor):
+    # O read_excel devolve inteiro quando o número não tem parte decimal
+    return int(valor) if isinstance(valor, float) and valor.is_integer() else valor
+
+def _texto_numerico(texto):
+    try:
+        return float(texto)
+    except ValueError:
+        return None
+
+class _ColunaTexto:
+    def __init__(self):
+        self.codigos = array('i')
+        self.mapa = {}
+
+    def adicionar(self, valor, linha):
+        if valor is None or (isinstance(valor, str) and valor in TEXTOS_VAZIOS):
+            self.codigos.append(-1)
+            return
+        texto = valor.strip() if isinstance(valor, str) else str(_numero_celula(valor)).strip()
+        self.codigos.append(self.mapa.setdefault(texto, len(self.mapa)))
+
+    def finalizar(self, n):
+        # Categorias em ordem alfabética, como no astype("category")
+        nomes = np.array(list(self.mapa), dtype=object)
+        ordem = np.argsort(nomes, kind="stable")
+        novo_codigo = np.empty(len(nomes), dtype=np.int32)
+        novo_codigo[ordem] = np.arange(len(nomes), dtype=np.int32)
+        codigos = np.frombuffer(self.codigos, dtype=np.int32)[:n]
+        codigos = np.where(codigos >= 0, novo_codigo[np.maximum(codigos, 0)], -1) if len(nomes) else codigos
+        return pd.Categorical.from_codes(codigos, categories=pd.Index(nomes[ordem], dtype="string"))
+
+class _ColunaId:
+    def __init__(self):
+        self.valores = []
+
+    def adicionar(self, valor, linha):
+        vazio = valor is None or (isinstance(valor, str) and valor in TEXTOS_VAZIOS)
+        self.valores.append(None if vazio else _id_texto(valor))
+
+    def finalizar(self, n):
+        return pd.array(self.valores[:n], dtype="string")
+
+class _ColunaNumero:
+    # Números em array de double; texto na coluna a rebaixa para objetos, como no read_excel
+    def __init__(self):
+        self.numeros = array('d')
+        self.inteiros = True
+        self.brutos = None
+
+    def adicionar(self, valor, linha):
+        if valor is None or (isinstance(valor, str) and valor in TEXTOS_VAZIOS):
+            valor = math.nan
+        elif isinstance(valor, (int, float)) and not isinstance(valor, bool):
+            valor = float(valor)
+            self.inteiros = self.inteiros and valor.is_integer()
+        elif isinstance(valor, str) and self.brutos is None and _texto_numerico(valor) is not None:
+            # Texto numérico ("12") vira número, como no parser do read_excel
+            valor = _texto_numerico(valor)
+            self.inteiros = self.inteiros and valor.is_integer()
+        elif self.brutos is None:
+            self.brutos = [_numero_celula(v) for v in self.numeros]
+
+        if self.brutos is not None:
+            self.brutos.append(_numero_celula(valor))
+        else:
+            self.numeros.append(valor)
+
+    def finalizar(self, n):
+        if self.brutos is not None:
+            return pd.Series(self.brutos[:n], dtype=object)
+        numeros = np.frombuffer(self.numeros, dtype=np.float64)[:n]
+        if self.inteiros and not np.isnan(numeros).any():
+            return numeros.astype(np.int64)
+        return numeros.copy()
+
+class _ColunaMoeda:
+    # Valores brutos: array de double enquanto só há números; com texto, lista de
+    # objetos. O texto "R$ 1.234,56" é convertido depois, por limpar_monetarias.
+    def __init__(self):
+        self.numeros = array('d')
+        self.brutos = None
+
+    def adicionar(self, valor, linha):
+        if valor is None or (isinstance(valor, str) and valor in TEXTOS_VAZIOS):
+            valor = None
+        elif self.brutos is None and (isinstance(valor, bool) or not isinstance(valor, (int, float))):
+            self.brutos = list(self.numeros)
+
+        if self.brutos is not None:
+            self.brutos.append(valor)
+        else:
+            self.numeros.append(math.nan if valor is None else float(valor))
+
+    def finalizar(self, n):
+        if self.brutos is not None:
+            return pd.Series(self.brutos[:n], dtype=object)
+        return np.frombuffer(self.numeros, dtype=np.float64)[:n].copy()
+
+def _coluna_stream(nome):
+    if nome == 'Projeto':
+        return _ColunaId()
+    if nome in COLS_MONETARIAS:
+        return _ColunaMoeda()
+    if nome in COLS_CATEGORICAS:
+        return _ColunaTexto()
+    return _ColunaNumero()
+
+def _ler_aba_streaming(ws):
+    ws.reset_dimensions()  # a dimensão gravada no arquivo nem sempre é confiável
+    linhas = ws.iter_rows(values_only=True)
+    cabecalho = [c for c in next(linhas, ())]
+
+    posicoes = {}
+    for i, nome in enumerate(cabecalho):
+        if nome in COLUNAS_USADAS and nome not in posicoes:
+            posicoes[nome] = i
+    colunas = [col for col in COLUNAS_USADAS if col in posicoes]
+    acumuladores = [(posicoes[col], _coluna_stream(col)) for col in colunas]
+
+    # Linhas vazias no meio são mantidas e as do fim descartadas, como no read_excel
+    n, ultima = 0, -1
+    for linha in linhas:
+        tamanho = len(linha)
+        for posicao, coluna in acumuladores:
+            coluna.adicionar(linha[posicao] if posicao < tamanho else None, n)
+        if any(v is not None and v != "" for v in linha):
+            ultima = n
+        n += 1
+    n = ultima + 1
+
+    df = pd.DataFrame({col: coluna.finalizar(n) for col, (_, coluna) in zip(colunas, acumuladores)})
+
+    # Moeda: conversão vetorizada, uma vez por aba (monetárias ausentes viram 0)
+    df, df_falhas = limpar_monetarias(df)
+    return cabecalho, df, df_falhas
+
+def ler_abas_xlsx(arquivo):
+    # [(aba, cabeçalho completo, dados, falhas)] de todas as abas do arquivo
+    from openpyxl import load_workbook
+
+    wb = load_workbook(arquivo, read_only=True, data_only=True, keep_links=False)
+    try:
+        return [(ws.title, *_ler_aba_streaming(ws)) for ws in wb.worksheets]
+    finally:
+        wb.close()
+
+# ---------------------------------------------------------
+# SNAPSHOT COLUNAR (PARQUET)
+# ---------------------------------------------------------
+def listar_planilhas(fonte):
+    if os.path.isdir(fonte):
+        arquivos = glob.glob(os.path.join(fonte, "*.xlsx"))
+    elif glob.has_magic(fonte):
+        arquivos = glob.glob(fonte)
+    else:
+        arquivos = [fonte]  # arquivo único: se não existir, o os.stat/read_excel avisa
+    # Arquivos de trava do Excel (~$nome.xlsx) ficam de fora
+    arquivos = sorted(a for a in arquivos if not os.path.basename(a).startswith("~$"))
+    if not arquivos:
+        raise FileNotFoundError(f"Nenhuma planilha encontrada em {fonte}")
+    return arquivos
+
+def _hash_arquivo(caminho):
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloco)
+    return h.hexdigest()[:16]
+
+def _hash_fonte(arquivos):
+    # Uma planilha: o hash dela. Várias: hash da lista (caminho + conteúdo de cada uma)
+    if len(arquivos) == 1:
+        return _hash_arquivo(arquivos[0])
+    h = hashlib.sha256()
+    for arquivo in arquivos:
+        h.update(f"{arquivo}:{_hash_arquivo(arquivo)}\n".encode())
+    return h.hexdigest()[:16]
+
+def _caminho_snapshot(versao, parte="dados"):
+    return os.path.join(PASTA_CACHE, f"{versao}-{parte}-s{VERSAO_SCHEMA}.parquet")
+
+def _gravar_parquet(df, destino):
+    # Escrita atômica: nenhuma sessão lê um parquet pela metade
+    temporario = f"{destino}.{os.getpid()}.tmp"
+    df.to_parquet(temporario, index=False, row_group_size=LINHAS_POR_GRUPO)
+    os.replace(temporario, destino)
+
+def _ler_planilha(arquivo):
+    # Roda nos processos do pool: leitura, validação e limpeza de todas as abas de um arquivo.
+    # Abas sem nenhuma coluna obrigatória (instruções, notas) são ignoradas.
+    abas = [(aba, cabecalho, df, df_falhas) for aba, cabecalho, df, df_falhas in ler_abas_xlsx(arquivo)
+            if not df.empty and set(COLUNAS_OBRIGATORIAS) & set(cabecalho)]
+
+    partes = []
+    for aba, cabecalho, df, df_falhas in abas:
+        origem = os.path.basename(arquivo) if len(abas) == 1 else f"{os.path.basename(arquivo)}:{aba}"
+        try:
+            validar_planilha(df)
+        except ValueError as erro:
+            raise ValueError(f"{origem}: {erro}") from None
+
+        colunas = [col for col in COLUNAS_USADAS if col in cabecalho]
+        partes.append((origem, colunas, df.assign(Origem=origem), df_falhas.assign(Origem=origem)))
+    return partes
+
+def _ler_fonte(arquivos):
+    trabalhadores = min(len(arquivos), os.cpu_count() or 1)
+    if trabalhadores == 1:
+        return [parte for arquivo in arquivos for parte in _ler_planilha(arquivo)]
+
+    # spawn: o servidor tem threads rodando, e fork com threads pode travar o filho
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(trabalhadores, mp_context=contexto) as pool:
+        return [parte for partes in pool.map(_ler_planilha, arquivos) for parte in partes]
+
+def _validar_schemas(partes):
+    if not partes:
+        raise ValueError("Nenhuma aba com dados de obras")
+    origem_ref, colunas_ref = partes[0][0], set(partes[0][1])
+    divergentes = [f"{origem} ({', '.join(sorted(colunas_ref ^ set(colunas)))})"
+                   for origem, colunas, _, _ in partes[1:] if set(colunas) != colunas_ref]
+    if divergentes:
+        raise ValueError(f"Colunas diferentes das de {origem_ref} em: {'; '.join(divergentes)}")
+
+def _gerar_snapshot(arquivos, versao):
+    destino = _caminho_snapshot(versao)
+    if os.path.exists(destino):
+        return destino
+
+    partes = _ler_fonte(arquivos)
+    _validar_schemas(partes)
+
+    df = pd.concat([df for _, _, df, _ in partes], ignore_index=True)
+    df_falhas = pd.concat([falhas for _, _, _, falhas in partes], ignore_index=True)
+    df['Projeto'] = ids_projeto(df['Projeto'])
+    df = compactar_tipos(df)
+    df_falhas = df_falhas.astype({"Origem": "string"})
+
+    # O relatório de falhas é gravado antes, o snapshot de dados marca a versão como pronta
+    os.makedirs(PASTA_CACHE, exist_ok=True)
+    _gravar_parquet(df_falhas, _caminho_snapshot(versao, "falhas"))
+    _gravar_parquet(df, destino)
+    return destino
+
+# ---------------------------------------------------------
+# VERSÃO DOS DADOS (VIGIA DO ARQUIVO)
+# ---------------------------------------------------------
+class VigiaArquivo:
+    # Observa a(s) planilha(s) e troca o token de versão só quando o conteúdo muda.
+    # Com pasta/glob, planilhas novas ou removidas também contam como mudança.
+    # Usa eventos do sistema de arquivos (watchdog/inotify) quando disponível,
+    # com varredura de mtime a cada `intervalo` segundos como reserva.
+    def __init__(self, caminho, intervalo=INTERVALO_VIGIA):
+        self.caminho = caminho
+        self.intervalo = intervalo
+        self.versao = None
+        self.ultimo_erro = None  # planilha nova rejeitada (a versão anterior segue em uso)
+        self._assinatura = None
+        self._ouvintes = []
+        self._evento = threading.Event()
+
+        self.verificar()
+
+        self._iniciar_watchdog()
+        threading.Thread(target=self._loop, name="vigia-dados", daemon=True).start()
+
+    def _iniciar_watchdog(self):
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            return
+
+        alvos = {os.path.abspath(a) for a in listar_planilhas(self.caminho)}
+        multipla = os.path.isdir(self.caminho) or glob.has_magic(self.caminho)
+        evento = self._evento
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                caminhos = (getattr(event, "src_path", None), getattr(event, "dest_path", None))
+                if any(c in alvos or (multipla and str(c).endswith(".xlsx")) for c in caminhos if c):
+                    evento.set()
+
+        observador = Observer()
+        observador.daemon = True
+        for pasta in {os.path.dirname(a) for a in alvos}:
+            observador.schedule(_Handler(), pasta, recursive=False)
+        observador.start()
+
+    def ao_mudar(self, callback):
+        self._ouvintes.append(callback)
+
+    def verificar(self):
+        # O hash só é recalculado quando a lista de planilhas ou algum mtime/tamanho mudam
+        arquivos = listar_planilhas(self.caminho)
+        assinatura = tuple((a, info.st_mtime_ns, info.st_size) for a, info in ((a, os.stat(a)) for a in arquivos))
+        if assinatura == self._assinatura:
+            return False
+
+        versao = _hash_fonte(arquivos)
+        self._assinatura = assinatura
+        if versao == self.versao:
+            self.ultimo_erro = None
+            return False
+
+        # Se falhar, o erro fica até a próxima mudança nos arquivos (a assinatura já foi aceita)
+        _gerar_snapshot(arquivos, versao)
+        self.ultimo_erro = None
+        self.versao = versao
+        for callback in self._ouvintes:
+            callback(versao)
+        return True
+
+    def _loop(self):
+        while True:
+            # Após um evento, espera a gravação assentar antes de ler o arquivo
+            if self._evento.wait(self.intervalo):
+                time.sleep(ESPERA_GRAVACAO)
+            self._evento.clear()
+            try:
+                self.verificar()
+            except Exception as erro:
+                # Arquivo sendo gravado, removido ou inválido: mantém a versão atual
+                self.ultimo_erro = str(erro)
+                log.warning("%s: %s", self.caminho, erro)
+
+# Um vigia por arquivo, compartilhado por todas as sessões
+@st.cache_resource(show_spinner=False)
+def vigia_dados(caminho=ARQUIVO_DADOS):
+    # Fonte remota: o vigia observa a cópia local que a fonte mantém atualizada
+    return VigiaArquivo(abrir_fonte(caminho).caminho)
+
+def versao_dados(caminho=ARQUIVO_DADOS):
+    return vigia_dados(caminho).versao
+
+def ler_snapshot(versao):
+    return pd.read_parquet(_caminho_snapshot(versao), memory_map=True)
+
+def ler_falhas(versao):
+    return pd.read_parquet(_caminho_snapshot(versao, "falhas"))
+
+def ler_ids(versao):
+    return pd.read_parquet(_caminho_snapshot(versao), columns=['Projeto'])['Projeto']
+
+def ler_linha(versao, posicao):
+    # Uma linha pela posição no snapshot, lendo só o row group dela (tipos preservados)
+    import pyarrow.parquet as pq
+
+    arquivo = pq.ParquetFile(_caminho_snapshot(versao))
+    for grupo in range(arquivo.num_row_groups):
+        linhas = arquivo.metadata.row_group(grupo).num_rows
+        if posicao < linhas:
+            return arquivo.read_row_group(grupo).slice(posicao, 1).to_pandas()
+        posicao -= linhas
+    raise IndexError(f"Linha fora do snapshot {versao}")
@@ -1,6 +1,14 @@
 import streamlit as st
-import pandas as pd
-import plotly.graph_objects as go
+
+from componentes import aviso_nova_versao
+from dados import ARQUIVO_DADOS
+from figuras import (COR_CABECALHO_PADRAO, CORES_CABECALHO, LINHAS_CUSTO, figura_tendencia, format_currency,
+                     format_percent, obter_figura, quadro_diagnostico)
+from historico import serie_projeto
+from ingestao import falhas_do_projeto, indice_projetos, registro_projeto
+from metricas import META_MARGEM
+from regras import nomes_alertas
+from perf import etapa, finalizar_execucao, iniciar_execucao, medir_fragmento
 
 # ---------------------------------------------------------
 # ESTILO CSS BLINDADO (Original)
@@ -84,54 +92,61 @@ st.markdown("""
 # ---------------------------------------------------------
 # FUNÇÕES E DADOS
 # ---------------------------------------------------------
-def format_currency(value):
-    if pd.isna(value): return "R$ 0,00"
-    return f"R$ {value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-
-def format_percent(value):
-    if pd.isna(value): return "0,0%"
-    return f"{value:.1f}%".replace(".", ",")
-
-@st.cache_data
-def load_data():
-    return pd.read_excel("dados_obras_v5.xlsx")
+iniciar_execucao("detalhe")
 
+# Só o índice de projetos: com a ingestão completa ainda em curso, um link direto
+# não espera a carteira inteira (ingestao.indice_projetos)
 try:
-    df_raw = load_data()
+    with etapa("indice_projetos"):
+        versao, indice = indice_projetos()
 except FileNotFoundError:
-    st.error("⚠️ Arquivo 'dados_obras_v5.xlsx' não encontrado.")
+    st.error(f"⚠️ Arquivo '{ARQUIVO_DADOS}' não encontrado.")
     st.stop()
 
 # ---------------------------------------------------------
 # SIDEBAR COM LÓGICA DE NAVEGAÇÃO
 # ---------------------------------------------------------
+# O projeto aberto vive na URL (?projeto=): link "Abrir ↗", favorito ou histórico
+# do navegador abrem direto nele, e a troca no seletor atualiza o endereço
 st.sidebar.markdown("### Seleção de Obra")
-lista_projetos = sorted(df_raw['Projeto'].unique())
+lista_projetos = indice['lista']
+
+def sincronizar_url():
+    st.query_params["projeto"] = str(st.session_state["projeto_detalhe"])
+
+# URL diferente do seletor = navegação externa (link, voltar/avançar): a URL prevalece
+projeto_url = indice['por_texto'].get(st.query_params.get("projeto"))
+if projeto_url is not None:
+    st.session_state["projeto_detalhe"] = projeto_url
+elif st.session_state.get("projeto_detalhe") not in indice['posicao']:
+    st.session_state["projeto_detalhe"] = lista_projetos[0]
+
+id_projeto = st.sidebar.selectbox("Projeto:", lista_projetos, key="projeto_detalhe", on_change=sincronizar_url)
+if st.query_params.get("projeto") != str(id_projeto):
+    sincronizar_url()
 
-# Tenta recuperar qual projeto foi clicado na Home
-index_padrao = 0
-if "projeto_foco" in st.session_state:
-    try:
-        index_padrao = lista_projetos.index(st.session_state["projeto_foco"])
-    except ValueError:
-        index_padrao = 0
+with etapa("registro_projeto"):
+    dados = registro_projeto(versao, id_projeto)
 
-id_projeto = st.sidebar.selectbox("Projeto:", lista_projetos, index=index_padrao)
-dados = df_raw[df_raw['Projeto'] == id_projeto].iloc[0]
+# Avisos de valores monetários não reconhecidos neste projeto
+falhas_projeto = falhas_do_projeto(versao, id_projeto)
+if not falhas_projeto.empty:
+    colunas_falha = ", ".join(falhas_projeto['Coluna'])
+    st.sidebar.warning(f"Valores não reconhecidos em: {colunas_falha} (considerados como 0).")
 
 # ---------------------------------------------------------
 # CÁLCULOS
 # ---------------------------------------------------------
-custo_total = dados['Mat_Real'] + dados['Desp_Real'] + dados['HH_Real_Vlr'] + dados['Impostos']
-lucro_liquido = dados['Vendido'] - custo_total
-margem_real_pct = (lucro_liquido / dados['Vendido']) * 100 if dados['Vendido'] > 0 else 0
-META_MARGEM = 25.0
+# Custo, lucro e margem vêm pré-calculados da tabela de projetos
+lucro_liquido = dados['Lucro']
+margem_real_pct = dados['Margem_%']
 
 # ---------------------------------------------------------
 # HEADER
 # ---------------------------------------------------------
-cor_map = {"Finalizado": "#238636", "Em andamento": "#1f6feb", "Não iniciado": "#8b949e"}
-cor_bg = cor_map.get(dados['Status'], "#30363d")
+aviso_nova_versao(versao)
+
+cor_bg = CORES_CABECALHO.get(dados['Status'], COR_CABECALHO_PADRAO)
 
 st.markdown(f"""
 <div class="header-box" style="border-left: 6px solid {cor_bg};">
@@ -147,6 +162,11 @@ st.markdown(f"""
 </div>
 """, unsafe_allow_html=True)
 
+# Alertas de regras.json que marcaram a obra como crítica
+if dados['E_Critico']:
+    motivos = [descricao for coluna, descricao in nomes_alertas() if dados.get(coluna)]
+    st.warning("**Obra crítica:** " + "; ".join(motivos), icon="⚠️")
+
 # ---------------------------------------------------------
 # KPI CARDS
 # ---------------------------------------------------------
@@ -181,66 +201,12 @@ st.subheader("⚙️ Eficiência Operacional")
 with st.container(border=True):
     col_gauges, col_spacer, col_diag = st.columns([5, 0.2, 3], vertical_alignment="center")
     
-    with col_gauges:
-        fig_gauge = go.Figure()
-
-        # Gauge 1: Físico
-        fig_gauge.add_trace(go.Indicator(
-            mode = "gauge+number", value = dados['Conclusao_%'],
-            title = {'text': "Avanço Físico", 'font': {'size': 14}},
-            domain = {'x': [0, 0.45], 'y': [0, 1]},
-            number = {'suffix': "%"},
-            gauge = {
-                'axis': {'range': [0, 100], 'tickcolor': "white"},
-                'bar': {'color': "#238636"}, 
-                'bgcolor': "#0d1117", 'borderwidth': 2, 'bordercolor': "#30363d"
-            }
-        ))
-
-        # Gauge 2: Horas
-        hh_orc = dados['HH_Orc_Qtd']
-        hh_real = dados['HH_Real_Qtd']
-        perc_hh = (hh_real / hh_orc * 100) if hh_orc > 0 else 0
-        cor_hh = "#da3633" if perc_hh > (dados['Conclusao_%'] + 10) else "#1f6feb"
-
-        fig_gauge.add_trace(go.Indicator(
-            mode = "gauge+number", value = perc_hh,
-            title = {'text': "Consumo Horas", 'font': {'size': 14}},
-            domain = {'x': [0.55, 1], 'y': [0, 1]},
-            number = {'suffix': "%", 'valueformat': ".1f"},
-            gauge = {
-                'axis': {'range': [0, max(100, perc_hh)], 'tickcolor': "white"},
-                'bar': {'color': cor_hh},
-                'bgcolor': "#0d1117", 'borderwidth': 2, 'bordercolor': "#30363d",
-                'threshold': {'line': {'color': "white", 'width': 3}, 'thickness': 0.75, 'value': dados['Conclusao_%']}
-            }
-        ))
-        
-        fig_gauge.update_layout(
-            height=220, margin=dict(t=40, b=20, l=30, r=30), 
-            paper_bgcolor='rgba(0,0,0,0)', font={'color': "white"},
-            xaxis={'fixedrange': True}, yaxis={'fixedrange': True}
-        )
+    with col_gauges, etapa("gauge"):
+        fig_gauge = obter_figura(id_projeto, "gauge", dados)
         st.plotly_chart(fig_gauge, use_container_width=True, config={'displayModeBar': False})
 
     with col_diag:
-        saldo_hh = hh_orc - hh_real
-        
-        if perc_hh > (dados['Conclusao_%'] + 10):
-            border_c = "#da3633" 
-            titulo = "Baixa Eficiência"
-            texto = "O gasto de horas ultrapassou o avanço físico em mais de 10%."
-            saldo_txt = f"Excedente: {int(hh_real - hh_orc)}h"
-        elif perc_hh < dados['Conclusao_%']:
-            border_c = "#238636"
-            titulo = "Alta Eficiência"
-            texto = "A obra está avançada em relação ao gasto de horas planejado."
-            saldo_txt = f"Saldo: {int(saldo_hh)}h"
-        else:
-            border_c = "#1f6feb"
-            titulo = "Equilibrado"
-            texto = "O ritmo de trabalho segue alinhado ao avanço físico."
-            saldo_txt = f"Saldo: {int(saldo_hh)}h"
+        border_c, titulo, texto, saldo_txt = quadro_diagnostico(dados)
 
         st.markdown(f"""
         <div style="background-color: #161b22; border-left: 4px solid {border_c}; padding: 15px; border-radius: 4px;">
@@ -256,39 +222,19 @@ st.divider()
 # ---------------------------------------------------------
 # SEÇÃO 2: COMPOSIÇÃO DE RESULTADO
 # ---------------------------------------------------------
-st.subheader("📊 Composição do Lucro")
-
-with st.container(border=True):
-    modo_vis = st.radio("Unidade de Medida:", ["Percentual (%)", "Valores (R$)"], horizontal=True, label_visibility="collapsed")
-    
-    labels = ["Vendido", "Impostos", "Materiais", "Despesas", "Mão de Obra", "Lucro"]
-    
-    if modo_vis == "Valores (R$)":
-        vals = [dados['Vendido'], -dados['Impostos'], -dados['Mat_Real'], -dados['Desp_Real'], -dados['HH_Real_Vlr'], lucro_liquido]
-        text_vals = [format_currency(v).replace("R$ ", "") for v in vals]
-    else:
-        base = dados['Vendido'] if dados['Vendido'] > 0 else 1
-        vals = [100, -(dados['Impostos']/base)*100, -(dados['Mat_Real']/base)*100, -(dados['Desp_Real']/base)*100, -(dados['HH_Real_Vlr']/base)*100, (lucro_liquido/base)*100]
-        text_vals = [format_percent(v) for v in vals]
-
-    fig_water = go.Figure(go.Waterfall(
-        orientation = "v", measure = ["relative"]*5 + ["total"],
-        x = labels, y = vals, text = text_vals, textposition = "outside",
-        connector = {"line":{"color":"#484f58"}},
-        decreasing = {"marker":{"color":"#da3633"}},
-        increasing = {"marker":{"color":"#238636"}},
-        totals = {"marker":{"color":"#1f6feb"}},
-        cliponaxis = False
-    ))
+# Fragmento: alternar % / R$ reconstrói só a cascata
+@st.fragment
+@medir_fragmento("cascata")
+def secao_composicao(id_projeto, dados):
+    st.subheader("📊 Composição do Lucro")
+
+    with st.container(border=True):
+        modo_vis = st.radio("Unidade de Medida:", ["Percentual (%)", "Valores (R$)"], horizontal=True, label_visibility="collapsed")
     
-    fig_water.update_layout(
-        height=320, margin=dict(t=50, b=10, l=10, r=10),
-        paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)',
-        yaxis=dict(showgrid=True, gridcolor='#30363d', zeroline=False, fixedrange=True),
-        xaxis=dict(tickfont=dict(color='white'), fixedrange=True),
-        font=dict(color='white')
-    )
-    st.plotly_chart(fig_water, use_container_width=True, config={'displayModeBar': False})
+        fig_water = obter_figura(id_projeto, "cascata", dados, modo_vis)
+        st.plotly_chart(fig_water, use_container_width=True, config={'displayModeBar': False})
+
+secao_composicao(id_projeto, dados)
 
 st.write("")
 st.divider()
@@ -298,53 +244,23 @@ st.divider()
 # ---------------------------------------------------------
 st.subheader("🔎 Detalhamento de Custos")
 
-def plot_row_fixed(titulo, orcado, real):
-    pct = (real / orcado * 100) if orcado > 0 else 0
-    cor_real = "#da3633" if real > orcado else "#1f6feb"
-    
-    fig = go.Figure()
-    
-    fig.add_trace(go.Bar(
-        y=[titulo], x=[orcado], name='Orçado', orientation='h', 
-        marker_color='#30363d', 
-        text=[format_currency(orcado)], textposition='outside',
-        cliponaxis=False
-    ))
-    
-    fig.add_trace(go.Bar(
-        y=[titulo], x=[real], name='Realizado', orientation='h', 
-        marker_color=cor_real, 
-        text=[format_currency(real)], textposition='outside',
-        cliponaxis=False 
-    ))
-
-    max_val = max(orcado, real) * 1.35 
-    
-    fig.update_layout(
-        title=dict(text=f"<b>{titulo}</b> <span style='color:#8b949e; font-size:14px'>- Consumo: {format_percent(pct)}</span>", x=0),
-        barmode='group',
-        height=140,
-        margin=dict(l=0, r=20, t=30, b=10),
-        paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)',
-        xaxis=dict(showgrid=True, gridcolor='#262730', showticklabels=False, range=[0, max_val], fixedrange=True),
-        yaxis=dict(showticklabels=False, fixedrange=True),
-        font=dict(color='white'),
-        showlegend=True,
-        legend=dict(
-            orientation="h",
-            yanchor="bottom", y=1.02,
-            xanchor="right", x=1,
-            font=dict(size=12, color="#8b949e"),
-            bgcolor="rgba(0,0,0,0)"
-        )
-    )
-    return fig
-
-with st.container(border=True):
-    st.plotly_chart(plot_row_fixed("Materiais", dados['Mat_Orc'], dados['Mat_Real']), use_container_width=True, config={'displayModeBar': False})
-
-with st.container(border=True):
-    st.plotly_chart(plot_row_fixed("Despesas", dados['Desp_Orc'], dados['Desp_Real']), use_container_width=True, config={'displayModeBar': False})
+with etapa("custos"):
+    for titulo, col_orc, col_real in LINHAS_CUSTO:
+        with st.container(border=True):
+            st.plotly_chart(obter_figura(id_projeto, titulo, dados), use_container_width=True, config={'displayModeBar': False})
 
-with st.container(border=True):
-    st.plotly_chart(plot_row_fixed("Mão de Obra (R$)", dados['HH_Orc_Vlr'], dados['HH_Real_Vlr']), use_container_width=True, config={'displayModeBar': False})
+# ---------------------------------------------------------
+# SEÇÃO 4: HISTÓRICO DO PROJETO
+# ---------------------------------------------------------
+# Uma linha por versão da planilha em que o projeto mudou
+with etapa("historico"):
+    serie = serie_projeto(id_projeto)
+    serie = serie[serie['Op'] != "D"]
+    if len(serie) > 1:
+        st.write("")
+        st.divider()
+        st.subheader("📈 Histórico do Projeto")
+        with st.container(border=True):
+            st.plotly_chart(figura_tendencia(serie), use_container_width=True, config={'displayModeBar': False})
+
+finalizar_execucao(versao)
@@ -0,0 +1,185 @@
+import argparse
+import html
+import math
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from dados import ARQUIVO_DADOS, _gerar_snapshot, _hash_fonte, listar_planilhas, ler_snapshot
+from fontes import abrir_fonte
+from metricas import META_MARGEM, montar_indice, montar_tabela_projetos
+from regras import nomes_alertas
+
+# ---------------------------------------------------------
+# EXPORTAÇÃO DOS RELATÓRIOS DE DETALHE (HTML ESTÁTICO)
+# ---------------------------------------------------------
+# `python exportar_relatorios.py` gera, para cada projeto, o conteúdo da página
+# "Detalhamento de Obra" (cabeçalho, KPIs, gauges, cascata e barras de custo)
+# num HTML próprio, com os mesmos construtores de figuras.py. O plotly.js é
+# gravado uma vez (plotly.min.js) e referenciado por todos os relatórios.
+PASTA_RELATORIOS = "relatorios"
+ARQUIVO_PLOTLY = "plotly.min.js"
+MODOS_CASCATA = ["Percentual (%)", "Valores (R$)"]
+CONFIG_FIGURA = {'displayModeBar': False, 'responsive': True}
+
+# Lotes por processo: mais lotes que processos equilibram projetos de custo desigual
+LOTES_POR_PROCESSO = 4
+
+ESTILO = """
+body {background-color: #0e1117; color: #e6edf3; font-family: "Source Sans Pro", sans-serif; max-width: 1200px; margin: 0 auto; padding: 2rem;}
+a {color: #58a6ff;}
+h2 {color: #f0f6fc; margin-top: 2rem;}
+.header-box {background-color: #1c1f26; border-radius: 10px; padding: 20px; border: 1px solid #30363d; margin-bottom: 20px;
+             display: flex; justify-content: space-between; align-items: center;}
+.header-title {color: #ffffff; font-size: 1.8rem; font-weight: 700;}
+.header-subtitle {color: #8b949e; font-size: 1rem; margin-top: 5px;}
+.header-status {font-weight: 600; padding: 8px 16px; border-radius: 20px; color: white; font-size: 0.9rem; white-space: nowrap;}
+.kpis {display: grid; grid-template-columns: repeat(4, 1fr); gap: 16px;}
+.kpi-card {background-color: #1c1f26; border-radius: 8px; padding: 20px; border: 1px solid #30363d;}
+.kpi-label {color: #a0aec0; font-size: 0.95rem; text-transform: uppercase; letter-spacing: 0.5px; margin-bottom: 8px;}
+.kpi-value {font-size: 2.0rem; font-weight: 700;}
+.painel {border: 1px solid #30363d; border-radius: 8px; padding: 10px; margin-bottom: 12px;}
+.eficiencia {display: grid; grid-template-columns: 5fr 3fr; gap: 16px; align-items: center;}
+.diagnostico {background-color: #161b22; padding: 15px; border-radius: 4px;}
+.alerta {background-color: rgba(218,54,51,0.15); border: 1px solid #da3633; border-radius: 8px; padding: 12px 16px; margin-bottom: 20px;}
+table {border-collapse: collapse; width: 100%;}
+th, td {border-bottom: 1px solid #30363d; padding: 6px 10px; text-align: left;}
+"""
+
+def _nome_arquivo(projeto):
+    return re.sub(r"[^\w.-]", "_", str(projeto)) + ".html"
+
+# ---------------------------------------------------------
+# UM RELATÓRIO (EXECUTADO NOS PROCESSOS DO POOL)
+# ---------------------------------------------------------
+def _html_figura(fig):
+    return fig.to_html(full_html=False, include_plotlyjs=False, config=CONFIG_FIGURA)
+
+def html_relatorio(dados):
+    from figuras import (COR_CABECALHO_PADRAO, CORES_CABECALHO, LINHAS_CUSTO, figura_cascata, figura_gauge,
+                         format_currency, format_percent, plot_row_fixed, quadro_diagnostico)
+
+    e = lambda valor: html.escape(str(valor))
+    cor_status = CORES_CABECALHO.get(dados['Status'], COR_CABECALHO_PADRAO)
+    cor_resultado = "#2ea043" if dados['Margem_%'] >= META_MARGEM else "#da3633"
+    cor_diag, titulo_diag, texto_diag, saldo_diag = quadro_diagnostico(dados)
+    motivos = [descricao for coluna, descricao in nomes_alertas() if dados.get(coluna)]
+    alerta = f'<div class="alerta">⚠️ <b>Obra crítica:</b> {e("; ".join(motivos))}</div>' if dados['E_Critico'] else ""
+
+    kpis = [("Valor Vendido", format_currency(dados['Vendido']), "#8b949e", "#ffffff"),
+            ("Valor Faturado", format_currency(dados['Faturado']), "#8b949e", "#ffffff"),
+            ("Lucro", format_currency(dados['Lucro']), cor_resultado, cor_resultado),
+            ("Margem de Lucro", format_percent(dados['Margem_%']), cor_resultado, cor_resultado)]
+    cards = "".join(f'<div class="kpi-card" style="border-left: 5px solid {borda};"><div class="kpi-label">{titulo}</div>'
+                    f'<div class="kpi-value" style="color: {texto}">{e(valor)}</div></div>'
+                    for titulo, valor, borda, texto in kpis)
+
+    cascatas = "".join(f'<div class="painel"><h3>{modo}</h3>{_html_figura(figura_cascata(dados, modo))}</div>'
+                       for modo in MODOS_CASCATA)
+    custos = "".join(f'<div class="painel">{_html_figura(plot_row_fixed(titulo, dados[orc], dados[real]))}</div>'
+                     for titulo, orc, real in LINHAS_CUSTO)
+
+    return f"""<!DOCTYPE html>
+<html lang="pt-BR"><head><meta charset="utf-8">
+<title>{e(dados['Projeto'])} - {e(dados['Descricao'])}</title>
+<script src="{ARQUIVO_PLOTLY}"></script><style>{ESTILO}</style></head>
+<body>
+<p><a href="index.html">← Todos os projetos</a></p>
+<div class="header-box" style="border-left: 6px solid {cor_status};">
+  <div><div class="header-title">{e(dados['Projeto'])} - {e(dados['Descricao'])}</div>
+  <div class="header-subtitle"><b>Cliente:</b> {e(dados['Cliente'])} &nbsp;|&nbsp; <b>Local:</b> {e(dados['Cidade'])}</div></div>
+  <div class="header-status" style="background-color: {cor_status};">{e(str(dados['Status']).upper())}</div>
+</div>
+{alerta}
+<div class="kpis">{cards}</div>
+<h2>⚙️ Eficiência Operacional</h2>
+<div class="painel eficiencia"><div>{_html_figura(figura_gauge(dados))}</div>
+  <div class="diagnostico" style="border-left: 4px solid {cor_diag};"><strong style="color: {cor_diag};">{titulo_diag}</strong><br>
+  <span style="color: #8b949e;">{texto_diag}</span><br><br><strong>{saldo_diag}</strong></div></div>
+<h2>📊 Composição do Lucro</h2>
+{cascatas}
+<h2>🔎 Detalhamento de Custos</h2>
+{custos}
+</body></html>
+"""
+
+def _exportar_lote(destino, registros):
+    for dados in registros:
+        with open(os.path.join(destino, _nome_arquivo(dados['Projeto'])), "w", encoding="utf-8") as f:
+            f.write(html_relatorio(dados))
+    return len(registros)
+
+# ---------------------------------------------------------
+# ÍNDICE E ORQUESTRAÇÃO
+# ---------------------------------------------------------
+def _html_indice(registros, versao):
+    from figuras import format_currency, format_percent
+
+    linhas = "".join(
+        f'<tr><td><a href="{html.escape(_nome_arquivo(d["Projeto"]))}">{html.escape(str(d["Projeto"]))}</a></td>'
+        f'<td>{html.escape(str(d["Descricao"]))}</td><td>{html.escape(str(d["Cliente"]))}</td>'
+        f'<td>{html.escape(str(d["Status"]))}</td><td>{format_currency(d["Vendido"])}</td><td>{format_percent(d["Margem_%"])}</td></tr>'
+        for d in registros
+    )
+    return f"""<!DOCTYPE html>
+<html lang="pt-BR"><head><meta charset="utf-8"><title>Relatórios de obras</title><style>{ESTILO}</style></head>
+<body><h1>Relatórios de obras</h1><p>{len(registros)} projetos · dados {versao} · gerado em {time.strftime("%d/%m/%Y %H:%M")}</p>
+<table><tr><th>Projeto</th><th>Descrição</th><th>Cliente</th><th>Status</th><th>Vendido</th><th>Margem</th></tr>{linhas}</table>
+</body></html>
+"""
+
+# IDs de --projetos fora da planilha: erro de uso na linha de comando
+class ProjetosDesconhecidos(ValueError):
+    pass
+
+def exportar(caminho=ARQUIVO_DADOS, destino=None, processos=None, projetos=None):
+    arquivos = listar_planilhas(abrir_fonte(caminho).caminho)
+    versao = _hash_fonte(arquivos)
+    _gerar_snapshot(arquivos, versao)
+    indice = montar_indice(montar_tabela_projetos(ler_snapshot(versao)))
+
+    desconhecidos = [p for p in projetos or [] if p not in indice['por_texto']]
+    if desconhecidos:
+        raise ProjetosDesconhecidos(f"Projetos não encontrados: {', '.join(desconhecidos)}")
+    selecionados = indice['lista'] if not projetos else [indice['por_texto'][p] for p in projetos]
+    registros = [indice['registros'][p] for p in selecionados]
+
+    destino = destino or os.path.join(PASTA_RELATORIOS, versao)
+    os.makedirs(destino, exist_ok=True)
+
+    # plotly.js uma vez só, compartilhado por todos os relatórios da pasta
+    from plotly.offline import get_plotlyjs
+    with open(os.path.join(destino, ARQUIVO_PLOTLY), "w", encoding="utf-8") as f:
+        f.write(get_plotlyjs())
+    with open(os.path.join(destino, "index.html"), "w", encoding="utf-8") as f:
+        f.write(_html_indice(registros, versao))
+
+    processos = max(1, min(processos or os.cpu_count() or 1, len(registros)))
+    if processos == 1:
+        _exportar_lote(destino, registros)
+        return destino, len(registros)
+
+    # Spawn, como na ingestão: cada processo importa o plotly uma vez e exporta vários lotes
+    tamanho = math.ceil(len(registros) / (processos * LOTES_POR_PROCESSO))
+    lotes = [registros[i:i + tamanho] for i in range(0, len(registros), tamanho)]
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=processos, mp_context=contexto) as pool:
+        total = sum(pool.map(_exportar_lote, [destino] * len(lotes), lotes))
+    return destino, total
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta o detalhamento de cada obra como HTML estático")
+    parser.add_argument("--fonte", default=ARQUIVO_DADOS, help="planilha, pasta, glob ou github:... (padrão: DASHBOARD_ARQUIVO)")
+    parser.add_argument("--saida", help="pasta de destino (padrão: relatorios/<versão dos dados>)")
+    parser.add_argument("--processos", type=int, help="processos paralelos (padrão: número de CPUs)")
+    parser.add_argument("--projetos", nargs="+", help="só estes projetos (IDs como na planilha)")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    try:
+        destino, total = exportar(args.fonte, args.saida, args.processos, args.projetos)
+    except ProjetosDesconhecidos as erro:
+        parser.error(str(erro))
+    print(f"[relatorios] {total} relatórios em {destino} ({time.perf_counter() - inicio:.1f}s)")
@@ -0,0 +1,236 @@
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import plotly.graph_objects as go
+import streamlit as st
+
+from metricas import TOLERANCIA_HORAS
+
+# ---------------------------------------------------------
+# FORMATAÇÃO
+# ---------------------------------------------------------
+def format_currency(value):
+    if pd.isna(value): return "R$ 0,00"
+    return f"R$ {value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+def format_percent(value):
+    if pd.isna(value): return "0,0%"
+    return f"{value:.1f}%".replace(".", ",")
+
+# ---------------------------------------------------------
+# CONSTRUTORES DE FIGURAS (PÁGINA DE DETALHE)
+# ---------------------------------------------------------
+def figura_gauge(dados):
+    fig_gauge = go.Figure()
+
+    # Gauge 1: Físico
+    fig_gauge.add_trace(go.Indicator(
+        mode = "gauge+number", value = dados['Conclusao_%'],
+        title = {'text': "Avanço Físico", 'font': {'size': 14}},
+        domain = {'x': [0, 0.45], 'y': [0, 1]},
+        number = {'suffix': "%"},
+        gauge = {
+            'axis': {'range': [0, 100], 'tickcolor': "white"},
+            'bar': {'color': "#238636"},
+            'bgcolor': "#0d1117", 'borderwidth': 2, 'bordercolor': "#30363d"
+        }
+    ))
+
+    # Gauge 2: Horas
+    perc_hh = dados['HH_Progresso']
+    cor_hh = "#da3633" if dados['Diagnostico'] == "Baixa Eficiência" else "#1f6feb"
+
+    fig_gauge.add_trace(go.Indicator(
+        mode = "gauge+number", value = perc_hh,
+        title = {'text': "Consumo Horas", 'font': {'size': 14}},
+        domain = {'x': [0.55, 1], 'y': [0, 1]},
+        number = {'suffix': "%", 'valueformat': ".1f"},
+        gauge = {
+            'axis': {'range': [0, max(100, perc_hh)], 'tickcolor': "white"},
+            'bar': {'color': cor_hh},
+            'bgcolor': "#0d1117", 'borderwidth': 2, 'bordercolor': "#30363d",
+            'threshold': {'line': {'color': "white", 'width': 3}, 'thickness': 0.75, 'value': dados['Conclusao_%']}
+        }
+    ))
+
+    fig_gauge.update_layout(
+        height=220, margin=dict(t=40, b=20, l=30, r=30),
+        paper_bgcolor='rgba(0,0,0,0)', font={'color': "white"},
+        xaxis={'fixedrange': True}, yaxis={'fixedrange': True}
+    )
+    return fig_gauge
+
+def figura_cascata(dados, modo_vis):
+    labels = ["Vendido", "Impostos", "Materiais", "Despesas", "Mão de Obra", "Lucro"]
+    lucro_liquido = dados['Lucro']
+
+    if modo_vis == "Valores (R$)":
+        vals = [dados['Vendido'], -dados['Impostos'], -dados['Mat_Real'], -dados['Desp_Real'], -dados['HH_Real_Vlr'], lucro_liquido]
+        text_vals = [format_currency(v).replace("R$ ", "") for v in vals]
+    else:
+        base = dados['Vendido'] if dados['Vendido'] > 0 else 1
+        vals = [100, -(dados['Impostos']/base)*100, -(dados['Mat_Real']/base)*100, -(dados['Desp_Real']/base)*100, -(dados['HH_Real_Vlr']/base)*100, (lucro_liquido/base)*100]
+        text_vals = [format_percent(v) for v in vals]
+
+    fig_water = go.Figure(go.Waterfall(
+        orientation = "v", measure = ["relative"]*5 + ["total"],
+        x = labels, y = vals, text = text_vals, textposition = "outside",
+        connector = {"line":{"color":"#484f58"}},
+        decreasing = {"marker":{"color":"#da3633"}},
+        increasing = {"marker":{"color":"#238636"}},
+        totals = {"marker":{"color":"#1f6feb"}},
+        cliponaxis = False
+    ))
+
+    fig_water.update_layout(
+        height=320, margin=dict(t=50, b=10, l=10, r=10),
+        paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)',
+        yaxis=dict(showgrid=True, gridcolor='#30363d', zeroline=False, fixedrange=True),
+        xaxis=dict(tickfont=dict(color='white'), fixedrange=True),
+        font=dict(color='white')
+    )
+    return fig_water
+
+def plot_row_fixed(titulo, orcado, real):
+    pct = (real / orcado * 100) if orcado > 0 else 0
+    cor_real = "#da3633" if real > orcado else "#1f6feb"
+
+    fig = go.Figure()
+
+    fig.add_trace(go.Bar(
+        y=[titulo], x=[orcado], name='Orçado', orientation='h',
+        marker_color='#30363d',
+        text=[format_currency(orcado)], textposition='outside',
+        cliponaxis=False
+    ))
+
+    fig.add_trace(go.Bar(
+        y=[titulo], x=[real], name='Realizado', orientation='h',
+        marker_color=cor_real,
+        text=[format_currency(real)], textposition='outside',
+        cliponaxis=False
+    ))
+
+    max_val = max(orcado, real) * 1.35
+
+    fig.update_layout(
+        title=dict(text=f"<b>{titulo}</b> <span style='color:#8b949e; font-size:14px'>- Consumo: {format_percent(pct)}</span>", x=0),
+        barmode='group',
+        height=140,
+        margin=dict(l=0, r=20, t=30, b=10),
+        paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)',
+        xaxis=dict(showgrid=True, gridcolor='#262730', showticklabels=False, range=[0, max_val], fixedrange=True),
+        yaxis=dict(showticklabels=False, fixedrange=True),
+        font=dict(color='white'),
+        showlegend=True,
+        legend=dict(
+            orientation="h",
+            yanchor="bottom", y=1.02,
+            xanchor="right", x=1,
+            font=dict(size=12, color="#8b949e"),
+            bgcolor="rgba(0,0,0,0)"
+        )
+    )
+    return fig
+
+def figura_tendencia(serie):
+    fig = go.Figure()
+    linhas = [("Margem", 'Margem_%', "#3fb950"), ("Consumo Horas", 'HH_Progresso', "#1f6feb"), ("Avanço Físico", 'Conclusao_%', "#a371f7")]
+    for nome, coluna, cor in linhas:
+        fig.add_trace(go.Scatter(
+            x=serie['Timestamp'], y=serie[coluna], name=nome, mode='lines+markers',
+            line=dict(color=cor, shape='hv'), hovertemplate="%{y:.1f}%<extra>" + nome + "</extra>"
+        ))
+
+    # Faturamento no eixo secundário (R$)
+    fig.add_trace(go.Scatter(
+        x=serie['Timestamp'], y=serie['Faturado'], name="Faturado", mode='lines+markers', yaxis='y2',
+        line=dict(color="#d29922", shape='hv', dash='dot'), hovertemplate="R$ %{y:,.2f}<extra>Faturado</extra>"
+    ))
+
+    fig.update_layout(
+        height=300, margin=dict(t=30, b=10, l=10, r=10),
+        paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)',
+        xaxis=dict(showgrid=False, fixedrange=True),
+        yaxis=dict(showgrid=True, gridcolor='#30363d', ticksuffix="%", fixedrange=True),
+        yaxis2=dict(overlaying='y', side='right', showgrid=False, fixedrange=True),
+        font=dict(color='white'),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1, bgcolor="rgba(0,0,0,0)")
+    )
+    return fig
+
+# Cor do cabeçalho do projeto por status
+CORES_CABECALHO = {"Finalizado": "#238636", "Em andamento": "#1f6feb", "Não iniciado": "#8b949e"}
+COR_CABECALHO_PADRAO = "#30363d"
+
+# Quadro ao lado dos gauges: (cor da borda, título, explicação, saldo de horas)
+def quadro_diagnostico(dados):
+    hh_orc = dados['HH_Orc_Qtd']
+    hh_real = dados['HH_Real_Qtd']
+    saldo_hh = hh_orc - hh_real
+
+    if dados['Diagnostico'] == "Baixa Eficiência":
+        return ("#da3633", "Baixa Eficiência", f"O gasto de horas ultrapassou o avanço físico em mais de {TOLERANCIA_HORAS:g}%.",
+                f"Excedente: {int(hh_real - hh_orc)}h")
+    if dados['Diagnostico'] == "Alta Eficiência":
+        return ("#238636", "Alta Eficiência", "A obra está avançada em relação ao gasto de horas planejado.",
+                f"Saldo: {int(saldo_hh)}h")
+    return ("#1f6feb", "Equilibrado", "O ritmo de trabalho segue alinhado ao avanço físico.",
+            f"Saldo: {int(saldo_hh)}h")
+
+# Barras de custo: (título, coluna orçada, coluna realizada)
+LINHAS_CUSTO = [
+    ("Materiais", 'Mat_Orc', 'Mat_Real'),
+    ("Despesas", 'Desp_Orc', 'Desp_Real'),
+    ("Mão de Obra (R$)", 'HH_Orc_Vlr', 'HH_Real_Vlr'),
+]
+
+# ---------------------------------------------------------
+# CACHE LRU DE FIGURAS
+# ---------------------------------------------------------
+MAX_FIGURAS = 256
+
+class CacheFiguras:
+    def __init__(self, limite=MAX_FIGURAS):
+        self.limite = limite
+        self.acertos = 0
+        self.faltas = 0
+        self._figuras = OrderedDict()
+        self._trava = threading.Lock()
+
+    def obter(self, chave, construir):
+        with self._trava:
+            fig = self._figuras.get(chave)
+            if fig is not None:
+                self._figuras.move_to_end(chave)
+                self.acertos += 1
+                return fig
+
+        # Construção fora da trava: sessões diferentes não esperam umas pelas outras
+        fig = construir()
+        with self._trava:
+            self.faltas += 1
+            self._figuras[chave] = fig
+            self._figuras.move_to_end(chave)
+            while len(self._figuras) > self.limite:
+                self._figuras.popitem(last=False)
+        return fig
+
+# Uma instância por servidor, compartilhada entre sessões
+@st.cache_resource(show_spinner=False)
+def cache_figuras():
+    return CacheFiguras()
+
+# Chave: (projeto, Hash_Linha, figura, modo). O hash da linha, em vez da versão,
+# mantém válidas entre versões as figuras dos projetos que não mudaram.
+# As figuras em cache não devem ser alteradas.
+def obter_figura(projeto, nome, dados, modo_vis=None):
+    chave = (projeto, int(dados['Hash_Linha']), nome, modo_vis)
+    if nome == "gauge":
+        return cache_figuras().obter(chave, lambda: figura_gauge(dados))
+    if nome == "cascata":
+        return cache_figuras().obter(chave, lambda: figura_cascata(dados, modo_vis))
+
+    titulo, col_orc, col_real = next(linha for linha in LINHAS_CUSTO if linha[0] == nome)
+    return cache_figuras().obter(chave, lambda: plot_row_fixed(titulo, dados[col_orc], dados[col_real]))
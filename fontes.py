@@ -0,0 +1,165 @@
+import base64
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+import streamlit as st
+
+log = logging.getLogger(__name__)
+
+# ---------------------------------------------------------
+# FONTES DE DADOS (LOCAL OU REPOSITÓRIO GIT)
+# ---------------------------------------------------------
+# DASHBOARD_ARQUIVO escolhe a fonte:
+#   "dados_obras_v5.xlsx", uma pasta ou um glob    -> arquivo(s) local(is)
+#   "github:dono/repo/caminho/planilha.xlsx@main"  -> blob de um repositório
+# A fonte remota é baixada para uma cópia local de caminho fixo; daí em diante a
+# ingestão é a mesma (dados.VigiaArquivo percebe a troca da cópia e gera a versão).
+#
+# Busca condicional: a API de conteúdo é consultada com If-None-Match (ETag) e
+# o blob só é baixado quando o SHA muda. Se a consulta falhar, fica a última
+# cópia boa. DASHBOARD_GITHUB_API troca a URL base (ex.: um servidor falso local).
+PASTA_FONTES = ".cache_fontes"
+URL_API_GITHUB = os.environ.get("DASHBOARD_GITHUB_API", "https://api.github.com")
+TOKEN_GITHUB = os.environ.get("GITHUB_TOKEN", "").strip()
+
+# Intervalo (s) entre consultas ao repositório e tempo limite de cada requisição
+INTERVALO_FONTE = float(os.environ.get("DASHBOARD_INTERVALO_FONTE", "60"))
+TIMEOUT_HTTP = 30
+
+_RE_GITHUB = re.compile(r"^github:(?P<repo>[^/]+/[^/@]+)/(?P<caminho>[^@]+?)(?:@(?P<ref>.+))?$")
+
+# ---------------------------------------------------------
+# CLIENTE HTTP (UMA CONEXÃO POR PROCESSO)
+# ---------------------------------------------------------
+# Sessão única: todas as sessões e a thread de consulta reaproveitam a conexão (keep-alive)
+@st.cache_resource(show_spinner=False)
+def sessao_http():
+    import requests
+
+    sessao = requests.Session()
+    sessao.headers["User-Agent"] = "dashboard-te"
+    if TOKEN_GITHUB:
+        sessao.headers["Authorization"] = f"Bearer {TOKEN_GITHUB}"
+    return sessao
+
+def sha_blob(conteudo):
+    # Mesmo SHA que o git atribui ao blob: confere o download contra o SHA anunciado
+    return hashlib.sha1(b"blob %d\0" % len(conteudo) + conteudo).hexdigest()
+
+# ---------------------------------------------------------
+# FONTES
+# ---------------------------------------------------------
+class FonteLocal:
+    def __init__(self, caminho):
+        self.caminho = caminho
+
+class FonteGithub:
+    def __init__(self, repo, caminho_repo, ref=None, url_api=URL_API_GITHUB, intervalo=INTERVALO_FONTE, sessao=None):
+        self.repo = repo
+        self.caminho_repo = caminho_repo
+        self.ref = ref
+        self.url_api = url_api.rstrip("/")
+        self.sessao = sessao or sessao_http()
+        self.ultimo_erro = None
+
+        # Cópia local de caminho fixo (a que a ingestão lê) + metadados da última busca
+        nome = f"{repo.replace('/', '_')}_{(ref or 'padrao').replace('/', '_')}_{os.path.basename(caminho_repo)}"
+        self.caminho = os.path.join(PASTA_FONTES, nome)
+        self._arquivo_meta = self.caminho + ".json"
+        self._meta = self._ler_meta()
+
+        # Primeira busca antes de servir: sem rede e sem cópia, a página mostra "não encontrado"
+        self.atualizar()
+        if not os.path.exists(self.caminho):
+            raise FileNotFoundError(f"{self.descricao}: sem cópia local e busca falhou ({self.ultimo_erro})")
+
+        if intervalo > 0:
+            threading.Thread(target=self._loop, args=(intervalo,), name="fonte-github", daemon=True).start()
+
+    @property
+    def descricao(self):
+        return f"github:{self.repo}/{self.caminho_repo}" + (f"@{self.ref}" if self.ref else "")
+
+    def _ler_meta(self):
+        try:
+            with open(self._arquivo_meta, encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        # Metadado sem a cópia correspondente não serve para a busca condicional
+        return meta if os.path.exists(self.caminho) else {}
+
+    def _gravar(self, destino, conteudo, modo="wb"):
+        temporario = f"{destino}.{os.getpid()}.tmp"
+        with open(temporario, modo) as f:
+            f.write(conteudo)
+        os.replace(temporario, destino)
+
+    def _consultar(self):
+        # Metadados do arquivo (SHA); 304 = nada mudou desde a última consulta
+        url = f"{self.url_api}/repos/{self.repo}/contents/{self.caminho_repo}"
+        cabecalhos = {"Accept": "application/vnd.github+json"}
+        if self._meta.get("etag"):
+            cabecalhos["If-None-Match"] = self._meta["etag"]
+        resposta = self.sessao.get(url, params={"ref": self.ref} if self.ref else None,
+                                   headers=cabecalhos, timeout=TIMEOUT_HTTP)
+        if resposta.status_code == 304:
+            return None, None
+        resposta.raise_for_status()
+        return resposta.json(), resposta.headers.get("ETag")
+
+    def _baixar(self, info):
+        # Arquivos pequenos já vêm em base64 na consulta; os demais, pelo blob bruto
+        if info.get("encoding") == "base64" and info.get("content"):
+            return base64.b64decode(info["content"])
+        url = f"{self.url_api}/repos/{self.repo}/git/blobs/{info['sha']}"
+        resposta = self.sessao.get(url, headers={"Accept": "application/vnd.github.raw"}, timeout=TIMEOUT_HTTP)
+        resposta.raise_for_status()
+        return resposta.content
+
+    def atualizar(self):
+        # True quando uma cópia nova foi gravada; falhas mantêm a última cópia boa
+        try:
+            info, etag = self._consultar()
+            if info is None:
+                self.ultimo_erro = None
+                return False
+
+            os.makedirs(PASTA_FONTES, exist_ok=True)
+            baixado = info['sha'] != self._meta.get("sha")
+            if baixado:
+                conteudo = self._baixar(info)
+                if sha_blob(conteudo) != info['sha']:
+                    raise ValueError(f"conteúdo baixado não confere com o SHA {info['sha']}")
+                self._gravar(self.caminho, conteudo)
+
+            self._meta = {'sha': info['sha'], 'etag': etag, 'verificado_em': time.time()}
+            self._gravar(self._arquivo_meta, json.dumps(self._meta), "w")
+            self.ultimo_erro = None
+            return baixado
+        except Exception as erro:
+            self.ultimo_erro = str(erro)
+            reserva = "mantida a última cópia" if os.path.exists(self.caminho) else "sem cópia local"
+            log.warning("%s: %s (%s)", self.descricao, erro, reserva)
+            return False
+
+    def _loop(self, intervalo):
+        while True:
+            time.sleep(intervalo)
+            self.atualizar()
+
+def criar_fonte(especificacao):
+    remoto = _RE_GITHUB.match(especificacao)
+    if remoto:
+        return FonteGithub(remoto['repo'], remoto['caminho'], remoto['ref'])
+    return FonteLocal(especificacao)
+
+# Uma fonte por especificação, compartilhada por todas as sessões
+@st.cache_resource(show_spinner=False)
+def abrir_fonte(especificacao):
+    return criar_fonte(especificacao)
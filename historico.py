@@ -0,0 +1,158 @@
+import glob
+import os
+import time
+from functools import lru_cache
+
+import pandas as pd
+
+from metricas import IDS_ADM
+
+# ---------------------------------------------------------
+# HISTÓRICO DE VERSÕES (DELTAS POR PROJETO)
+# ---------------------------------------------------------
+# Cada versão ingerida grava só as linhas que mudaram em relação à anterior
+# (I = inserida, U = alterada, D = removida), em parquet comprimido e ordenado
+# por Projeto. Como cada linha de delta traz o estado completo das colunas
+# acompanhadas, a série de um projeto é simplesmente o conjunto das suas linhas.
+PASTA_HISTORICO = "historico_dados"
+PASTA_DELTAS = os.path.join(PASTA_HISTORICO, "deltas")
+ARQUIVO_ESTADO = os.path.join(PASTA_HISTORICO, "estado.parquet")
+ARQUIVO_CARTEIRA = os.path.join(PASTA_HISTORICO, "carteira.parquet")
+
+COLS_HISTORICO = ['Status', 'Vendido', 'Faturado', 'Custo_Total', 'Lucro', 'Margem_%', 'HH_Progresso', 'Conclusao_%']
+
+# Acima deste número de arquivos de delta, eles são fundidos num só (ordenado por Projeto, Timestamp)
+MAX_ARQUIVOS_DELTA = 50
+SUFIXO_COMPACTADO = "-compactado.parquet"
+
+# Leituras da série refeitas quando a compactação remove um arquivo no meio delas
+TENTATIVAS_LEITURA = 3
+
+COMPRESSAO = "zstd"
+
+def _gravar(df, destino):
+    temporario = f"{destino}.{os.getpid()}.tmp"
+    df.to_parquet(temporario, index=False, compression=COMPRESSAO)
+    os.replace(temporario, destino)
+
+def _estado(projetos):
+    estado = projetos.drop_duplicates('Projeto')[['Projeto'] + COLS_HISTORICO].copy()
+    estado['Projeto'] = estado['Projeto'].astype(str)
+    estado['Status'] = estado['Status'].astype("string")
+    # Tipos fixos: todos os arquivos de delta precisam do mesmo schema
+    numericas = [col for col in COLS_HISTORICO if col != 'Status']
+    estado[numericas] = estado[numericas].astype(float)
+    return estado.set_index('Projeto')
+
+def calcular_delta(anterior, atual):
+    inseridos = atual.index.difference(anterior.index)
+    removidos = anterior.index.difference(atual.index)
+
+    comuns = atual.index.intersection(anterior.index)
+    a, b = atual.loc[comuns], anterior.loc[comuns, COLS_HISTORICO]
+    # NA de um lado só conta como mudança: a comparação com NA dá NA, que .all() ignoraria
+    iguais = (a.eq(b).fillna(False) | (a.isna() & b.isna())).all(axis=1)
+    alterados = comuns[~iguais.to_numpy()]
+
+    partes = [
+        atual.loc[inseridos].assign(Op="I"),
+        atual.loc[alterados].assign(Op="U"),
+        anterior.loc[removidos].assign(Op="D"),
+    ]
+    return pd.concat(partes).rename_axis('Projeto').reset_index()
+
+def _resumo_carteira(projetos, versao, instante):
+    obras = projetos[~projetos['Projeto'].isin(IDS_ADM)]
+    vendido = obras['Vendido'].sum()
+    custo = obras['Custo_Total'].sum()
+    hh_orc = obras['HH_Orc_Qtd'].sum()
+    return pd.DataFrame([{
+        'Timestamp': instante,
+        'Versao': versao,
+        'Vendido': vendido,
+        'Faturado': obras['Faturado'].sum(),
+        'Custo_Total': custo,
+        'Margem_%': ((vendido - custo) / vendido * 100) if vendido > 0 else 0.0,
+        'HH_Progresso': (obras['HH_Real_Qtd'].sum() / hh_orc * 100) if hh_orc > 0 else 0.0,
+        'Qtd_Obras': len(obras),
+    }])
+
+def registrar_versao(versao, projetos, instante=None):
+    os.makedirs(PASTA_DELTAS, exist_ok=True)
+    carteira = pd.read_parquet(ARQUIVO_CARTEIRA) if os.path.exists(ARQUIVO_CARTEIRA) else None
+    if carteira is not None and not carteira.empty and carteira['Versao'].iloc[-1] == versao:
+        return False
+
+    instante = pd.Timestamp(instante if instante is not None else time.time(), unit="s", tz="UTC")
+    atual = _estado(projetos)
+    anterior = pd.read_parquet(ARQUIVO_ESTADO).set_index('Projeto') if os.path.exists(ARQUIVO_ESTADO) else atual.iloc[0:0]
+
+    delta = calcular_delta(anterior, atual)
+    if not delta.empty:
+        delta.insert(1, 'Timestamp', instante)
+        delta.insert(2, 'Versao', versao)
+        delta = delta.sort_values('Projeto', kind="stable")
+        _gravar(delta, os.path.join(PASTA_DELTAS, f"{instante.strftime('%Y%m%dT%H%M%S%f')}-{versao}.parquet"))
+
+    resumo = _resumo_carteira(projetos, versao, instante)
+    _gravar(resumo if carteira is None else pd.concat([carteira, resumo], ignore_index=True), ARQUIVO_CARTEIRA)
+    _gravar(atual.reset_index(), ARQUIVO_ESTADO)
+
+    if len(glob.glob(os.path.join(PASTA_DELTAS, "*.parquet"))) > MAX_ARQUIVOS_DELTA:
+        compactar()
+    serie_projeto.cache_clear()
+    serie_carteira.cache_clear()
+    return True
+
+def compactar():
+    arquivos = sorted(glob.glob(os.path.join(PASTA_DELTAS, "*.parquet")))
+    if len(arquivos) < 2:
+        return
+    # O nome do compactado herda o do delta mais recente, mantendo a ordem cronológica dos arquivos
+    df = pd.concat([pd.read_parquet(a) for a in arquivos], ignore_index=True)
+    df = df.sort_values(['Projeto', 'Timestamp'], kind="stable")
+    destino = arquivos[-1].replace(".parquet", SUFIXO_COMPACTADO)
+    _gravar(df, destino)
+    for arquivo in arquivos:
+        os.remove(arquivo)
+
+# ---------------------------------------------------------
+# CONSULTAS (SÉRIES PARA OS GRÁFICOS DE TENDÊNCIA)
+# ---------------------------------------------------------
+# Filtro por Projeto empurrado para o leitor: arquivos e row groups fora da faixa são pulados
+def _arquivos_delta():
+    # Lista explícita: temporários em gravação (*.tmp) ficam de fora
+    arquivos = sorted(glob.glob(os.path.join(PASTA_DELTAS, "*.parquet")))
+
+    # Entre gravar o compactado e remover os originais, os dois convivem na pasta:
+    # os deltas que ele cobre (nome até o do mais recente fundido) ficam de fora
+    compactados = [a for a in arquivos if a.endswith(SUFIXO_COMPACTADO)]
+    if compactados:
+        ultimo = compactados[-1]
+        limite = ultimo.replace(SUFIXO_COMPACTADO, ".parquet")
+        arquivos = [a for a in arquivos if a == ultimo or a > limite]
+    return arquivos
+
+@lru_cache(maxsize=256)
+def serie_projeto(projeto):
+    import pyarrow.dataset as ds  # só a página de detalhe consulta séries por projeto
+
+    # A compactação (thread de ingestão) pode remover arquivos entre a listagem e a
+    # leitura: a pasta é listada de novo
+    for tentativa in range(TENTATIVAS_LEITURA):
+        arquivos = _arquivos_delta()
+        if not arquivos:
+            return pd.DataFrame(columns=['Timestamp', 'Versao', 'Op'] + COLS_HISTORICO)
+        try:
+            tabela = ds.dataset(arquivos, format="parquet").to_table(filter=ds.field('Projeto') == str(projeto))
+            break
+        except FileNotFoundError:
+            if tentativa == TENTATIVAS_LEITURA - 1:
+                raise
+    return tabela.to_pandas().sort_values('Timestamp').reset_index(drop=True)
+
+@lru_cache(maxsize=1)
+def serie_carteira():
+    if not os.path.exists(ARQUIVO_CARTEIRA):
+        return pd.DataFrame(columns=['Timestamp', 'Versao', 'Vendido', 'Faturado', 'Custo_Total', 'Margem_%', 'HH_Progresso', 'Qtd_Obras'])
+    return pd.read_parquet(ARQUIVO_CARTEIRA)
@@ -0,0 +1,228 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from busca import IndiceBusca, montar_busca
+from consulta_sql import BACKEND_SQL, buscar_projeto, gerar_banco
+from dados import ARQUIVO_DADOS, COLS_METADADOS, ler_falhas, ler_ids, ler_linha, ler_snapshot, versao_dados, vigia_dados
+from historico import registrar_versao
+from metricas import (IDS_ADM, atualizar_tabela_projetos, montar_cubo, montar_indice, montar_indice_leve,
+                      montar_tabela_projetos)
+
+log = logging.getLogger(__name__)
+
+# ---------------------------------------------------------
+# DETECÇÃO DE MUDANÇAS POR PROJETO
+# ---------------------------------------------------------
+# Cada linha da planilha ganha um hash dos seus valores (Hash_Linha); por
+# Projeto, ele é comparado com o da versão anterior em memória. Só os projetos
+# inseridos ou alterados têm métricas e registro do índice recalculados, e as
+# figuras em cache (chave = Projeto + Hash_Linha) dos demais seguem válidas.
+@dataclass(frozen=True)
+class Diferencas:
+    versao_anterior: str
+    inseridos: frozenset
+    alterados: frozenset
+    removidos: frozenset
+
+    @property
+    def mudaram(self):
+        return self.inseridos | self.alterados
+
+def hash_linhas(dados):
+    # Só os valores da própria linha entram no hash (a linha lida sozinha dá o mesmo),
+    # sem os metadados: renomear a planilha não altera nenhum projeto. int64 para caber no SQLite
+    valores = dados.drop(columns=[col for col in COLS_METADADOS if col in dados.columns])
+    return pd.util.hash_pandas_object(valores, index=False).to_numpy().view(np.int64)
+
+def com_hash(dados):
+    return dados.assign(Hash_Linha=hash_linhas(dados))
+
+def hash_por_projeto(projetos):
+    hashes = pd.Series(projetos['Hash_Linha'].to_numpy(), index=projetos['Projeto'].astype(str).to_numpy())
+    if hashes.index.has_duplicates:
+        # Projeto em mais de uma linha: um hash do conjunto, na ordem da planilha
+        repetidos = hashes.index.duplicated(keep=False)
+        combinados = hashes[repetidos].groupby(level=0, sort=False).agg(lambda h: hash(tuple(h)))
+        hashes = pd.concat([hashes[~repetidos], combinados.astype(np.int64)])
+    return hashes
+
+def comparar_versoes(anterior, atual, versao_anterior):
+    # Séries de hash por Projeto; casamento por posição (get_indexer), sem .loc por rótulo
+    posicoes = anterior.index.get_indexer(atual.index)
+    presentes = posicoes >= 0
+    alterados = presentes.copy()
+    alterados[presentes] = anterior.to_numpy()[posicoes[presentes]] != atual.to_numpy()[presentes]
+    removidos = np.ones(len(anterior), dtype=bool)
+    removidos[posicoes[presentes]] = False
+    return Diferencas(
+        versao_anterior=versao_anterior,
+        inseridos=frozenset(atual.index[~presentes]),
+        alterados=frozenset(atual.index[alterados]),
+        removidos=frozenset(anterior.index[removidos]),
+    )
+
+# ---------------------------------------------------------
+# SNAPSHOT (TUDO O QUE AS PÁGINAS LEEM DE UMA VERSÃO)
+# ---------------------------------------------------------
+# Imutável e compartilhado entre sessões: as páginas não devem alterar os frames
+@dataclass(frozen=True)
+class Snapshot:
+    versao: str
+    criado_em: float
+    projetos: pd.DataFrame
+    obras: pd.DataFrame
+    falhas: pd.DataFrame
+    cubo: pd.DataFrame
+    indice: dict
+    busca: IndiceBusca
+    hashes: pd.Series
+    diferencas: Diferencas = None  # None na primeira versão do processo
+
+def construir_snapshot(versao, anterior=None):
+    dados = com_hash(ler_snapshot(versao))
+    hashes = hash_por_projeto(dados)
+
+    # Com a versão anterior em memória, só as linhas que mudaram são recalculadas
+    diferencas = None
+    if anterior is None:
+        projetos = montar_tabela_projetos(dados)
+    else:
+        diferencas = comparar_versoes(anterior.hashes, hashes, anterior.versao)
+        projetos = atualizar_tabela_projetos(dados, anterior.projetos)
+
+    # Overhead no fim, obras na ordem da planilha: `obras` é uma fatia, sem cópia
+    e_adm = projetos['Projeto'].isin(IDS_ADM).to_numpy()
+    projetos = projetos.iloc[np.argsort(e_adm, kind="stable")]
+    obras = projetos.iloc[:int((~e_adm).sum())]
+
+    # Com o backend SQL ativo, o banco indexado fica pronto antes da troca de versão
+    if BACKEND_SQL:
+        gerar_banco(versao, projetos)
+
+    return Snapshot(
+        versao=versao,
+        criado_em=time.time(),
+        projetos=projetos,
+        obras=obras,
+        falhas=ler_falhas(versao),
+        cubo=montar_cubo(projetos),
+        indice=montar_indice(projetos) if diferencas is None else
+               montar_indice(projetos, anterior.indice, diferencas.mudaram),
+        busca=montar_busca(obras),
+        hashes=hashes,
+        diferencas=diferencas,
+    )
+
+# ---------------------------------------------------------
+# WORKER DE INGESTÃO (DUPLO BUFFER)
+# ---------------------------------------------------------
+class Ingestor:
+    # As sessões sempre leem `atual`; a próxima versão é montada numa thread
+    # própria e só substitui a atual depois de pronta. Se a montagem falhar,
+    # a versão boa continua no ar e o erro fica em `ultimo_erro`.
+    def __init__(self, vigia):
+        self.vigia = vigia
+        self.ultimo_erro = None
+        self._pedido = threading.Event()
+
+        # Inscrição antes da primeira montagem: uma troca da planilha durante ela
+        # fica no pedido e o _loop a processa logo ao iniciar
+        vigia.ao_mudar(lambda versao: self._pedido.set())
+
+        # Primeira versão: montada na inicialização, antes de servir qualquer sessão
+        self.atual = construir_snapshot(vigia.versao)
+
+        threading.Thread(target=self._loop, name="ingestao-dados", daemon=True).start()
+
+    def _registrar_historico(self, snapshot):
+        # O histórico é acessório: uma falha aqui nunca derruba a versão em uso
+        try:
+            registrar_versao(snapshot.versao, snapshot.projetos, snapshot.criado_em)
+        except Exception as erro:
+            log.warning("histórico da versão %s não gravado: %s", snapshot.versao, erro)
+
+    def _loop(self):
+        self._registrar_historico(self.atual)
+        while True:
+            self._pedido.wait()
+            self._pedido.clear()
+
+            versao = self.vigia.versao
+            if versao == self.atual.versao:
+                # A planilha voltou à versão em uso: uma rejeição anterior deixa de valer
+                self.ultimo_erro = None
+                continue
+            try:
+                novo = construir_snapshot(versao, self.atual)
+            except Exception as erro:
+                self.ultimo_erro = f"{versao}: {erro}"
+                log.warning("versão %s rejeitada: %s", versao, erro)
+                continue
+
+            # Troca atômica da referência: quem já leu a versão anterior segue com ela
+            self.atual = novo
+            self.ultimo_erro = None
+            self._registrar_historico(novo)
+
+# Ingestores com a primeira versão pronta, por caminho (consultados sem bloquear)
+_ingestores = {}
+
+# Iniciado uma vez por servidor (main.py); as páginas só leem o snapshot atual
+@st.cache_resource(show_spinner="Carregando base de obras...")
+def iniciar_ingestao(caminho=ARQUIVO_DADOS):
+    ingestor = _ingestores[caminho] = Ingestor(vigia_dados(caminho))
+    return ingestor
+
+def snapshot_atual(caminho=ARQUIVO_DADOS):
+    return iniciar_ingestao(caminho).atual
+
+def snapshot_pronto(caminho=ARQUIVO_DADOS):
+    # Snapshot completo, se a ingestão já terminou; None enquanto ela roda (não espera)
+    ingestor = _ingestores.get(caminho)
+    return ingestor.atual if ingestor is not None else None
+
+def erro_ingestao(caminho=ARQUIVO_DADOS):
+    # Motivo da rejeição da última versão da planilha (None se a versão em uso é a mais recente)
+    # Rejeição na leitura/validação (vigia) ou na montagem do snapshot (ingestor)
+    ingestor = _ingestores.get(caminho)
+    if ingestor is None:
+        return None
+    return ingestor.vigia.ultimo_erro or ingestor.ultimo_erro
+
+# ---------------------------------------------------------
+# CONSULTA DE UM PROJETO (LINK DIRETO PARA O DETALHE)
+# ---------------------------------------------------------
+# Um link ?projeto= aberto antes da ingestão completa (partida a frio, carteira
+# grande) não espera métricas, cubo e índices da carteira inteira: lê só a
+# coluna Projeto do parquet e, do projeto pedido, o row group da sua linha.
+@lru_cache(maxsize=2)
+def _indice_leve(versao):
+    return montar_indice_leve(ler_ids(versao))
+
+def indice_projetos(caminho=ARQUIVO_DADOS):
+    snapshot = snapshot_pronto(caminho)
+    if snapshot is not None:
+        return snapshot.versao, snapshot.indice
+    versao = versao_dados(caminho)
+    return versao, _indice_leve(versao)
+
+def registro_projeto(versao, projeto, caminho=ARQUIVO_DADOS):
+    snapshot = snapshot_pronto(caminho)
+    if snapshot is not None and snapshot.versao == versao:
+        return buscar_projeto(versao, projeto) if BACKEND_SQL else snapshot.indice['registros'][projeto]
+
+    # Métricas de uma linha só: mesmas funções vetorizadas da tabela de projetos
+    linha = ler_linha(versao, _indice_leve(versao)['linhas'][projeto])
+    return montar_tabela_projetos(com_hash(linha)).to_dict('records')[0]
+
+def falhas_do_projeto(versao, projeto, caminho=ARQUIVO_DADOS):
+    snapshot = snapshot_pronto(caminho)
+    falhas = snapshot.falhas if snapshot is not None and snapshot.versao == versao else ler_falhas(versao)
+    return falhas[falhas['Projeto'] == str(projeto)]
@@ -1,8 +1,15 @@
 import streamlit as st
 
+from aquecimento import iniciar_aquecimento
+
 # Configuração da Página Principal
 st.set_page_config(page_title="Portal TE Engenharia", layout="wide", page_icon="🏗️")
 
+# Ingestão e caches aquecidos em segundo plano, uma única vez por servidor.
+# A página não espera: se precisar do snapshot antes, aguarda só a ingestão.
+# Se a planilha não existir, as páginas mostram o aviso correspondente.
+aquecimento = iniciar_aquecimento()
+
 # Definição do Menu de Navegação
 # Removi a página de admin daqui
 pg = st.navigation([
@@ -12,3 +19,4 @@ pg = st.navigation([
 
 # Executa a navegação
 pg.run()
+aquecimento.registrar_renderizacao()
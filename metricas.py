@@ -0,0 +1,179 @@
+import numpy as np
+import pandas as pd
+
+from dados import COLS_METADADOS
+from regras import REGRAS, avaliar_alertas
+
+# ---------------------------------------------------------
+# METAS E PARÂMETROS (regras.json)
+# ---------------------------------------------------------
+# IDs dos custos administrativos (Overhead), no formato de texto exato de dados.ids_projeto
+IDS_ADM = list(REGRAS.ids_adm)
+
+META_VENDAS = REGRAS.metas['vendas']
+META_MARGEM = REGRAS.metas['margem']
+
+# Horas acima do físico (p.p.) que caracterizam baixa eficiência; margem líquida
+# pós-ADM aceita abaixo da meta (p.p.)
+TOLERANCIA_HORAS = REGRAS.limiares.get('tolerancia_horas', 10.0)
+TOLERANCIA_MARGEM_LIQUIDA = REGRAS.limiares.get('tolerancia_margem_liquida', 10.0)
+
+# ---------------------------------------------------------
+# MÉTRICAS POR PROJETO (VETORIZADAS)
+# ---------------------------------------------------------
+def _percentual(parte, total):
+    # Em float64 mesmo com entradas float32: os limiares (100%, físico + tolerância) ficam exatos
+    return (parte.astype(np.float64) / total * 100).where(total > 0, 0.0)
+
+def calcular_metricas(df):
+    custo = df['Mat_Real'] + df['Desp_Real'] + df['HH_Real_Vlr'] + df['Impostos']
+    lucro = df['Vendido'] - custo
+    margem = _percentual(lucro, df['Vendido'])
+    hh_progresso = _percentual(df['HH_Real_Qtd'], df['HH_Orc_Qtd'])
+    mat_pct = _percentual(df['Mat_Real'], df['Mat_Orc'])
+    fisico = df['Conclusao_%']
+
+    diagnostico = np.select(
+        [hh_progresso > fisico + TOLERANCIA_HORAS, hh_progresso < fisico],
+        ["Baixa Eficiência", "Alta Eficiência"],
+        default="Equilibrado",
+    )
+
+    metricas = pd.DataFrame({
+        'Custo_Total': custo,
+        'Lucro': lucro,
+        'Margem_%': margem,
+        'HH_Progresso': hh_progresso,
+        'Mat_%': mat_pct,
+        'Diagnostico': pd.Categorical(diagnostico),
+    }, index=df.index)
+
+    # Alertas configuráveis (regras.json) sobre dados + métricas: Alerta_<nome>, E_Critico e Motivo_Critico
+    alertas = avaliar_alertas(pd.concat([df, metricas], axis=1))
+    return pd.concat([metricas, alertas], axis=1)
+
+# Tabela de projetos = dados limpos + métricas
+def montar_tabela_projetos(df):
+    return pd.concat([df, calcular_metricas(df)], axis=1)
+
+# Incremental: as métricas dependem só da própria linha, então uma linha cujo
+# Hash_Linha já existia na tabela anterior reaproveita as métricas de lá e só as
+# demais são calculadas. Resultado igual ao de montar_tabela_projetos(df).
+def atualizar_tabela_projetos(df, anterior):
+    antigas = anterior.drop_duplicates('Hash_Linha')
+    posicoes = pd.Index(antigas['Hash_Linha']).get_indexer(df['Hash_Linha'])
+    recalcular = posicoes < 0
+    if recalcular.all():
+        return montar_tabela_projetos(df)
+
+    colunas = [col for col in anterior.columns if col not in df.columns]
+    metricas = antigas[colunas].take(np.where(recalcular, 0, posicoes)).set_axis(df.index)
+    if recalcular.any():
+        novas = calcular_metricas(df[recalcular])
+        for col in colunas:
+            if isinstance(metricas[col].dtype, pd.CategoricalDtype):
+                # Códigos sobre a união das categorias; só as presentes ficam, em ordem
+                categorias = metricas[col].cat.categories.union(novas[col].cat.categories)
+                codigos = metricas[col].cat.set_categories(categorias).cat.codes.to_numpy().copy()
+                codigos[recalcular] = novas[col].cat.set_categories(categorias).cat.codes.to_numpy()
+                metricas[col] = pd.Categorical.from_codes(codigos, categorias).remove_unused_categories()
+            else:
+                metricas.loc[recalcular, col] = novas[col].to_numpy()
+    return pd.concat([df, metricas], axis=1)
+
+# ---------------------------------------------------------
+# CUBO DE AGREGAÇÃO (KPIs DO CABEÇALHO)
+# ---------------------------------------------------------
+COLS_CUBO = ['Vendido', 'Faturado', 'Mat_Real', 'Desp_Real', 'HH_Real_Vlr', 'Impostos', 'Custo_Total']
+
+STATUS_CARTEIRA = ['Não iniciado', 'Em andamento', 'Finalizado', 'Apresentado']
+STATUS_CONCLUIDO = ['Finalizado', 'Apresentado']
+STATUS_ABERTO = ['Em andamento', 'Não iniciado']
+
+def montar_cubo(df):
+    tipo = pd.Series(np.where(df['Projeto'].isin(IDS_ADM), 'ADM', 'Obra'), index=df.index, name='Tipo')
+    # observed=True: só as combinações presentes (Status, Cliente e Cidade são categorias)
+    grupos = df[COLS_CUBO].groupby([tipo, df['Status'], df['Cliente'], df['Cidade']], dropna=False, observed=True)
+    cubo = grupos.sum()
+    cubo['Qtd'] = grupos.size()
+    return cubo.reset_index()
+
+def _margem(venda, custo):
+    return ((venda - custo) / venda * 100) if venda > 0 else 0
+
+def kpis_cabecalho(cubo, cliente=None, cidade=None):
+    obras = cubo[cubo['Tipo'] == 'Obra']
+    custo_adm_total = cubo.loc[cubo['Tipo'] == 'ADM', 'Custo_Total'].sum()
+
+    # Recorte opcional por cliente/cidade (drill-down)
+    if cliente is not None:
+        obras = obras[obras['Cliente'] == cliente]
+    if cidade is not None:
+        obras = obras[obras['Cidade'] == cidade]
+
+    carteira = obras[obras['Status'].isin(STATUS_CARTEIRA)]
+    concluido = obras[obras['Status'].isin(STATUS_CONCLUIDO)]
+
+    valor_vendido_total = carteira['Vendido'].sum()
+    valor_concluido = concluido['Vendido'].sum()
+    custo_obras_total = obras['Custo_Total'].sum()
+
+    # Num recorte, o overhead é rateado pela participação no valor vendido da carteira
+    if cliente is not None or cidade is not None:
+        vendido_carteira = cubo.loc[(cubo['Tipo'] == 'Obra') & cubo['Status'].isin(STATUS_CARTEIRA), 'Vendido'].sum()
+        custo_adm_total = custo_adm_total * (valor_vendido_total / vendido_carteira) if vendido_carteira > 0 else 0.0
+
+    lucro_liquido_final = valor_vendido_total - custo_obras_total - custo_adm_total
+
+    return {
+        'valor_vendido_total': valor_vendido_total,
+        'valor_concluido': valor_concluido,
+        'valor_faturado_total': obras['Faturado'].sum(),
+        'custo_adm_total': custo_adm_total,
+        'overhead_pct': (custo_adm_total / valor_vendido_total * 100) if valor_vendido_total > 0 else 0,
+        'mg_geral': _margem(obras['Vendido'].sum(), custo_obras_total),
+        'mg_concluida': _margem(valor_concluido, concluido['Custo_Total'].sum()),
+        'mg_liquida_pos_adm': (lucro_liquido_final / valor_vendido_total * 100) if valor_vendido_total > 0 else 0,
+        'qtd_aberto': int(obras.loc[obras['Status'].isin(STATUS_ABERTO), 'Qtd'].sum()),
+        'qtd_total': int(obras['Qtd'].sum()),
+    }
+
+# ---------------------------------------------------------
+# ÍNDICE DE PROJETOS (PÁGINA DE DETALHE)
+# ---------------------------------------------------------
+def _indice_lista(lista):
+    return {
+        'lista': lista,
+        'posicao': {projeto: i for i, projeto in enumerate(lista)},
+        'por_texto': {str(projeto): projeto for projeto in lista},  # ?projeto= na URL
+    }
+
+def montar_indice(df, anterior=None, mudaram=frozenset()):
+    # Projeto é categoria ordenada pelo valor numérico do ID
+    lista = df['Projeto'].drop_duplicates().sort_values().tolist()
+
+    # Um registro por projeto (a primeira linha, como o antigo .iloc[0])
+    unicos = df.drop_duplicates('Projeto')
+
+    # Incremental: só os projetos em `mudaram` (inseridos/alterados) viram registros
+    # novos; os demais reaproveitam o do índice anterior, salvo se algum metadado
+    # (fora do hash, ex.: Origem) mudou
+    if anterior is None:
+        registros = {}
+    else:
+        registros = {p: anterior['registros'].get(p) for p in lista}
+        refazer = unicos['Projeto'].isin(list(mudaram)).to_numpy().copy()
+        for col in COLS_METADADOS:
+            if col in unicos.columns:
+                antigos = [(registros[p] or {}).get(col) for p in unicos['Projeto']]
+                refazer |= unicos[col].to_numpy(dtype=object) != np.array(antigos, dtype=object)
+        unicos = unicos[refazer]
+
+    registros.update(zip(unicos['Projeto'], unicos.to_dict('records')))
+    return {**_indice_lista(lista), 'registros': registros}
+
+# Só a coluna Projeto: mesma lista do índice completo, com a posição da primeira
+# linha de cada projeto no snapshot no lugar dos registros
+def montar_indice_leve(ids):
+    unicos = ids.drop_duplicates()
+    return {**_indice_lista(unicos.sort_values().tolist()), 'linhas': dict(zip(unicos, unicos.index))}
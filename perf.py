@@ -0,0 +1,174 @@
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+
+log = logging.getLogger(__name__)
+
+# ---------------------------------------------------------
+# INSTRUMENTAÇÃO DE DESEMPENHO (OPCIONAL)
+# ---------------------------------------------------------
+# Ative com ?debug=1 na URL (vale para a sessão toda; ?debug=0 desliga) ou com
+# DASHBOARD_DEBUG=1 no ambiente. Com ela ativa, cada execução de página mostra
+# o painel na sidebar e grava uma linha JSON em ARQUIVO_LOG; a reexecução só de
+# um fragmento (medir_fragmento) grava a sua própria linha e mostra o painel no
+# fim do fragmento (fragmentos não escrevem na sidebar).
+DEBUG_AMBIENTE = os.environ.get("DASHBOARD_DEBUG", "").strip() == "1"
+ARQUIVO_LOG = os.environ.get("DASHBOARD_PERF_LOG", "perf_dashboard.jsonl")
+
+# Várias sessões gravam no mesmo arquivo
+_trava_log = threading.Lock()
+
+def instrumentacao_ativa():
+    debug = st.query_params.get("debug")
+    if debug is not None:
+        st.session_state["_perf_debug"] = debug == "1"
+    return DEBUG_AMBIENTE or st.session_state.get("_perf_debug", False)
+
+# ---------------------------------------------------------
+# CRONÔMETRO POR ETAPA
+# ---------------------------------------------------------
+def iniciar_execucao(pagina, fragmento=None):
+    st.session_state.setdefault("_perf_sessao", uuid.uuid4().hex[:8])
+    st.session_state["_perf"] = {'pagina': pagina, 'fragmento': fragmento, 'inicio': time.perf_counter(),
+                                 'etapas': {}, 'aberta': True}
+
+# Bloco `with etapa("nome"):` ou decorador `@etapa("nome")` (também sob @st.fragment:
+# a reexecução do fragmento atualiza o tempo da etapa)
+@contextmanager
+def etapa(nome):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registro = st.session_state.get("_perf")
+        if registro is not None:
+            registro['etapas'][nome] = (time.perf_counter() - inicio) * 1000
+
+# Decorador sob @st.fragment: dentro da execução da página equivale a @etapa(nome);
+# quando só o fragmento reexecuta (a medição da página já foi fechada), abre uma
+# medição própria e a finaliza no fim do fragmento
+def medir_fragmento(nome):
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def envoltorio(*args, **kwargs):
+            anterior = st.session_state.get("_perf")
+            if anterior is not None and anterior['aberta']:
+                with etapa(nome):
+                    return funcao(*args, **kwargs)
+
+            iniciar_execucao(anterior['pagina'] if anterior else None, fragmento=nome)
+            with etapa(nome):
+                resultado = funcao(*args, **kwargs)
+            finalizar_execucao(anterior.get('versao') if anterior else None)
+            return resultado
+        return envoltorio
+    return decorador
+
+# ---------------------------------------------------------
+# CACHES E MEMÓRIA
+# ---------------------------------------------------------
+def estatisticas_cache():
+    caches = {}
+    # Só consulta módulos já carregados pela página (não força import do plotly)
+    if "figuras" in sys.modules:
+        figuras = sys.modules["figuras"].cache_figuras()
+        caches['figuras'] = {'acertos': figuras.acertos, 'faltas': figuras.faltas, 'itens': len(figuras._figuras)}
+    if "historico" in sys.modules:
+        historico = sys.modules["historico"]
+        for nome in ("serie_projeto", "serie_carteira"):
+            info = getattr(historico, nome).cache_info()
+            caches[nome] = {'acertos': info.hits, 'faltas': info.misses, 'itens': info.currsize}
+    return caches
+
+def estado_aquecimento():
+    if "aquecimento" not in sys.modules:
+        return None
+    aquecimento = sys.modules["aquecimento"].iniciar_aquecimento()
+    return {'pronto': aquecimento.pronto.is_set(), 'etapas_ms': aquecimento.etapas,
+            'primeira_renderizacao_s': aquecimento.primeira_renderizacao_s, 'erro': aquecimento.erro}
+
+def _tamanho_bytes(valor):
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(deep=True).sum())
+    if isinstance(valor, pd.Series):
+        return int(valor.memory_usage(deep=True))
+    return sys.getsizeof(valor)
+
+def memoria_sessao_mb():
+    # Só o que é próprio da sessão; o snapshot é compartilhado entre todas
+    return sum(_tamanho_bytes(v) for k, v in st.session_state.items() if k != "_perf") / 1024 ** 2
+
+def memoria_processo_mb():
+    # RSS atual no Linux; fora dele, o pico reportado pelo sistema
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+# ---------------------------------------------------------
+# LOG E PAINEL
+# ---------------------------------------------------------
+def _gravar_log(linha):
+    try:
+        with _trava_log, open(ARQUIVO_LOG, "a", encoding="utf-8") as f:
+            f.write(json.dumps(linha, ensure_ascii=False) + "\n")
+    except OSError as erro:
+        log.warning("log não gravado em %s: %s", ARQUIVO_LOG, erro)
+
+def _painel(linha):
+    if linha['fragmento']:
+        painel = st.expander(f"⏱️ Desempenho ({linha['fragmento']})", expanded=True)
+    else:
+        painel = st.sidebar.expander("⏱️ Desempenho", expanded=True)
+    with painel:
+        st.metric("Execução do fragmento" if linha['fragmento'] else "Execução da página", f"{linha['total_ms']:.0f} ms")
+        etapas = pd.DataFrame(list(linha['etapas'].items()), columns=["Etapa", "ms"])
+        st.dataframe(etapas, hide_index=True, use_container_width=True, column_config={"ms": st.column_config.NumberColumn(format="%.1f")})
+
+        if linha['caches']:
+            caches = pd.DataFrame.from_dict(linha['caches'], orient="index").rename_axis("Cache").reset_index()
+            st.dataframe(caches, hide_index=True, use_container_width=True)
+
+        aquecimento = linha['aquecimento']
+        if aquecimento and aquecimento['primeira_renderizacao_s'] is not None:
+            st.caption(f"Primeira renderização do processo: {aquecimento['primeira_renderizacao_s']:.1f}s após o início")
+
+        st.caption(f"Sessão {linha['sessao']}: {linha['memoria_sessao_mb'] * 1024:.1f} KB · "
+                   f"Processo: {linha['memoria_processo_mb']:.0f} MB · Dados {linha['versao']}")
+
+def finalizar_execucao(versao=None):
+    registro = st.session_state.get("_perf")
+    if registro is None or not registro['aberta']:
+        return
+    # Fechada: as reexecuções de fragmento seguintes abrem a sua própria medição
+    registro['aberta'] = False
+    registro['versao'] = versao
+    if not instrumentacao_ativa():
+        return
+
+    linha = {
+        'instante': time.time(),
+        'sessao': st.session_state["_perf_sessao"],
+        'pagina': registro['pagina'],
+        'fragmento': registro['fragmento'],
+        'versao': versao,
+        'total_ms': (time.perf_counter() - registro['inicio']) * 1000,
+        'etapas': registro['etapas'],
+        'caches': estatisticas_cache(),
+        'aquecimento': estado_aquecimento(),
+        'memoria_sessao_mb': memoria_sessao_mb(),
+        'memoria_processo_mb': memoria_processo_mb(),
+    }
+    _gravar_log(linha)
+    _painel(linha)
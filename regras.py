@@ -0,0 +1,99 @@
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# ---------------------------------------------------------
+# REGRAS DE NEGÓCIO (METAS, LIMIARES E ALERTAS CONFIGURÁVEIS)
+# ---------------------------------------------------------
+# Metas, limiares, IDs de overhead e alertas vêm de regras.json (ou do arquivo
+# em DASHBOARD_REGRAS), lido uma vez na inicialização: alterações valem a partir
+# do próximo início do servidor.
+#
+# Cada alerta é uma expressão booleana do DataFrame.eval sobre a tabela de
+# projetos (colunas da planilha + métricas), com metas e limiares como @nome.
+# Avaliadas de uma vez para a tabela inteira, a cada versão dos dados: viram uma
+# coluna Alerta_<nome> por regra, E_Critico (qualquer alerta) e Motivo_Critico.
+ARQUIVO_REGRAS = os.environ.get("DASHBOARD_REGRAS",
+                                os.path.join(os.path.dirname(os.path.abspath(__file__)), "regras.json"))
+
+PREFIXO_ALERTA = "Alerta_"
+SEPARADOR_MOTIVOS = "; "
+
+@dataclass(frozen=True)
+class Regra:
+    nome: str
+    descricao: str
+    expressao: str
+
+@dataclass(frozen=True)
+class Configuracao:
+    metas: dict
+    limiares: dict
+    ids_adm: tuple
+    alertas: tuple
+    assinatura: str  # hash do arquivo: entra no nome dos caches em disco que dependem das regras
+
+    @property
+    def variaveis(self):
+        # Nomes disponíveis como @nome nas expressões
+        return {**self.metas, **self.limiares}
+
+def carregar_regras(caminho=ARQUIVO_REGRAS):
+    with open(caminho, "rb") as f:
+        conteudo = f.read()
+    try:
+        bruto = json.loads(conteudo)
+        alertas = tuple(Regra(a['nome'], a['descricao'], a['expressao']) for a in bruto['alertas'])
+        config = Configuracao(
+            metas={k: float(v) for k, v in bruto['metas'].items()},
+            limiares={k: float(v) for k, v in bruto.get('limiares', {}).items()},
+            ids_adm=tuple(str(i) for i in bruto.get('ids_adm', [])),
+            alertas=alertas,
+            assinatura=hashlib.sha256(conteudo).hexdigest()[:8],
+        )
+    except (ValueError, KeyError, TypeError) as erro:
+        raise ValueError(f"Configuração de regras inválida em {caminho}: {erro!r}") from erro
+
+    for obrigatoria in ('vendas', 'margem'):
+        if obrigatoria not in config.metas:
+            raise ValueError(f"Configuração de regras inválida em {caminho}: falta a meta '{obrigatoria}'")
+    nomes = [regra.nome for regra in alertas]
+    if len(set(nomes)) != len(nomes):
+        raise ValueError(f"Configuração de regras inválida em {caminho}: nomes de alerta repetidos")
+    return config
+
+REGRAS = carregar_regras()
+
+# ---------------------------------------------------------
+# AVALIAÇÃO VETORIZADA
+# ---------------------------------------------------------
+def avaliar_alertas(tabela, config=REGRAS):
+    variaveis = config.variaveis
+    flags = {}
+    for regra in config.alertas:
+        try:
+            resultado = tabela.eval(regra.expressao, local_dict=variaveis)
+        except Exception as erro:
+            raise ValueError(f"Alerta '{regra.nome}' inválido ({regra.expressao}): {erro}") from erro
+        if getattr(resultado, "dtype", None) != bool:
+            raise ValueError(f"Alerta '{regra.nome}' não é uma expressão booleana: {regra.expressao}")
+        flags[PREFIXO_ALERTA + regra.nome] = resultado.to_numpy()
+
+    alertas = pd.DataFrame(flags, index=tabela.index)
+    critico = alertas.any(axis=1) if flags else pd.Series(False, index=tabela.index)
+
+    # Motivos concatenados por coluna (poucas combinações distintas: categoria)
+    motivo = np.full(len(tabela), "", dtype=object)
+    for regra in config.alertas:
+        marcado = alertas[PREFIXO_ALERTA + regra.nome].to_numpy()
+        motivo = np.where(marcado & (motivo != ""), motivo + SEPARADOR_MOTIVOS, motivo)
+        motivo = np.where(marcado, motivo + regra.descricao, motivo)
+
+    return alertas.assign(E_Critico=critico, Motivo_Critico=pd.Categorical(motivo))
+
+def nomes_alertas(config=REGRAS):
+    return [(PREFIXO_ALERTA + regra.nome, regra.descricao) for regra in config.alertas]
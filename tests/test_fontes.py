@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests  # noqa: E402
+
+import fontes  # noqa: E402
+
+# ---------------------------------------------------------
+# SERVIDOR FALSO DA API DE CONTEÚDO DO GITHUB
+# ---------------------------------------------------------
+# Responde /contents/ com o SHA do blob e ETag (304 com If-None-Match igual) e
+# /git/blobs/<sha> com o conteúdo bruto; guarda os caminhos pedidos.
+class _ServidorFalso(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    conteudo = b""
+    pedidos = []
+
+    def log_message(self, *args):
+        pass
+
+    def _responder(self, status, corpo=b"", cabecalhos=None):
+        self.send_response(status)
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def do_GET(self):
+        caminho = self.path.split("?")[0]
+        type(self).pedidos.append(caminho)
+        sha = fontes.sha_blob(type(self).conteudo)
+        etag = f'"{sha}"'
+
+        if "/contents/" in caminho:
+            if self.headers.get("If-None-Match") == etag:
+                self._responder(304)
+            else:
+                info = json.dumps({'sha': sha, 'size': len(type(self).conteudo)}).encode()
+                self._responder(200, info, {"ETag": etag})
+        elif caminho.endswith(f"/git/blobs/{sha}"):
+            self._responder(200, type(self).conteudo)
+        else:
+            self._responder(404)
+
+class TesteFonteGithub(unittest.TestCase):
+    def setUp(self):
+        self.pasta = tempfile.mkdtemp()
+        self._pasta_original = fontes.PASTA_FONTES
+        fontes.PASTA_FONTES = self.pasta
+
+        _ServidorFalso.conteudo = b"planilha v1"
+        _ServidorFalso.pedidos = []
+        self.servidor = ThreadingHTTPServer(("127.0.0.1", 0), _ServidorFalso)
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.servidor.server_address[1]}"
+        self.sessao = requests.Session()
+
+    def tearDown(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+        self.sessao.close()
+        fontes.PASTA_FONTES = self._pasta_original
+        shutil.rmtree(self.pasta, ignore_errors=True)
+
+    def _baixados(self):
+        return [p for p in _ServidorFalso.pedidos if "/git/blobs/" in p]
+
+    def test_busca_condicional(self):
+        # 1. Primeira busca: consulta + download do blob
+        fonte = fontes.FonteGithub("dono/repo", "dados/planilha.xlsx", "main",
+                                   url_api=self.url, intervalo=0, sessao=self.sessao)
+        self.assertEqual(len(self._baixados()), 1)
+        with open(fonte.caminho, "rb") as f:
+            self.assertEqual(f.read(), b"planilha v1")
+
+        # 2. Nada mudou: 304 e nenhum download
+        _ServidorFalso.pedidos.clear()
+        self.assertFalse(fonte.atualizar())
+        self.assertEqual(_ServidorFalso.pedidos, ["/repos/dono/repo/contents/dados/planilha.xlsx"])
+        self.assertIsNone(fonte.ultimo_erro)
+
+        # 3. SHA novo: um download, cópia local substituída
+        _ServidorFalso.conteudo = b"planilha v2"
+        _ServidorFalso.pedidos.clear()
+        self.assertTrue(fonte.atualizar())
+        self.assertEqual(self._baixados(), [f"/repos/dono/repo/git/blobs/{fontes.sha_blob(b'planilha v2')}"])
+        with open(fonte.caminho, "rb") as f:
+            self.assertEqual(f.read(), b"planilha v2")
+
+    def test_sha_blob_igual_ao_git(self):
+        # `git hash-object` de um arquivo com "hello\n"
+        self.assertEqual(fontes.sha_blob(b"hello\n"), "ce013625030ba8dba906f756967f9e9ca394464a")
+        self.assertEqual(fontes.sha_blob(b""), hashlib.sha1(b"blob 0\0").hexdigest())
+
+if __name__ == "__main__":
+    unittest.main()